@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from core.config import settings
 from core.logging import setup_logging
-from app.obsession_router import router as obsession_router
+from core.metrics import metrics
+from app.obsession_router import router as obsession_router, traffic_capture, analytics_sink, chatbot_service
 
 # 로깅 설정
 setup_logging()
@@ -26,6 +28,19 @@ app.add_middleware(
 # 라우터 등록
 app.include_router(obsession_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def startup():
+    # LLM 커넥션 미리 열기
+    await run_in_threadpool(chatbot_service.warm_up)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 캡처 큐에 남은 레코드 기록
+    traffic_capture.close()
+    # 분석 결과 저장 큐에 남은 결과 기록
+    analytics_sink.close()
+    chatbot_service.close()
+
 @app.get("/")
 async def root():
     return {
@@ -36,4 +51,8 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot() 
\ No newline at end of file
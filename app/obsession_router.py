@@ -1,121 +1,317 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import time
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+import anyio
+from fastapi import APIRouter, Header, HTTPException, Request
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from models.request import ObsessionAnalysisRequest, ObsessionAnalysisResponse, ObsessionAnalysis2Request, ObsessionAnalysis2Response, ObsessionAnalysis3Request, ObsessionAnalysis3Response, ObsessionAnalysis4Request, ObsessionAnalysis4Response, ObsessionAnalysis5Request, ObsessionAnalysis5Response, ObsessionAnalysis6Request, ObsessionAnalysis6Response
 from services.chatbot_service import ChatbotService
 from formatters.obsession_formatter import format_obsession_question
+from services.traffic_capture import TrafficCapture
+from services.input_triage import InputTriage, TriageDecision
+from services.analytics_sink import AnalyticsSink
+from services.request_context import RequestContext, request_scope, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, REASON_DISCONNECTED
+from core.config import settings
 from core.logging import get_logger
+from core.metrics import metrics
 
 logger = get_logger(__name__)
 
 router = APIRouter(prefix="/obsession", tags=["obsession-analysis"])
 
 # 서비스 인스턴스 생성
-chatbot_service = ChatbotService()
+traffic_capture = TrafficCapture(
+    settings.TRAFFIC_CAPTURE_PATH,
+    enabled=settings.TRAFFIC_CAPTURE_ENABLED,
+    queue_size=settings.TRAFFIC_CAPTURE_QUEUE_SIZE
+)
+chatbot_service = ChatbotService(traffic_capture=traffic_capture)
+# LLM 호출 없이 답할 수 있는 입력을 걸러내는 앞단
+input_triage = InputTriage()
+# 제품 분석용 결과 저장 (write-behind)
+analytics_sink = AnalyticsSink(
+    settings.ANALYTICS_SINK_PATH,
+    enabled=settings.ANALYTICS_SINK_ENABLED,
+    queue_size=settings.ANALYTICS_SINK_QUEUE_SIZE,
+    batch_size=settings.ANALYTICS_SINK_BATCH_SIZE,
+    flush_interval=settings.ANALYTICS_SINK_FLUSH_INTERVAL,
+    policy=settings.ANALYTICS_SINK_FULL_POLICY,
+    block_timeout=settings.ANALYTICS_SINK_BLOCK_TIMEOUT
+)
+
+# 우선순위별 작업 스레드 한도 (이벤트 루프 안에서 만들어야 하므로 첫 호출 때 생성)
+_worker_limiters: Dict[str, anyio.CapacityLimiter] = {}
+
+def _worker_limiter(priority: str) -> anyio.CapacityLimiter:
+    """
+    우선순위 클래스별 스레드 한도를 반환합니다.
+    LLM 자리를 기다리는 동안에도 스레드를 점유하므로, 공용 스레드풀(기본 40개)을 함께 쓰면
+    밀린 background 작업이 스레드를 모두 차지해 interactive 요청이 스케줄러에 도달하지도 못합니다.
+    """
+    if priority not in _worker_limiters:
+        if priority == PRIORITY_BACKGROUND:
+            _worker_limiters[priority] = anyio.CapacityLimiter(settings.LLM_BACKGROUND_WORKER_THREADS)
+        else:
+            _worker_limiters[priority] = anyio.CapacityLimiter(settings.LLM_INTERACTIVE_WORKER_THREADS)
+    return _worker_limiters[priority]
+
+def _run_in_scope(context: RequestContext, func: Callable[..., Any], *args: Any) -> Any:
+    with request_scope(context):
+        return func(*args)
+
+async def _call_service(http_request: Request, context: RequestContext, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    ChatbotService 메서드를 요청 우선순위의 작업 스레드에서 실행합니다.
+    LLM 호출을 기다리는 동안 이벤트 루프가 막히지 않고, 스케줄러가 요청 간 우선순위를 조정할 수 있습니다.
+    스레드 자리는 이벤트 루프 안에서 기다리므로 background 요청이 밀려도 interactive 요청의 스레드를 차지하지 않습니다.
+    실행 중 클라이언트가 연결을 끊으면 context를 취소해 아직 시작하지 않은 LLM 호출을 포기하게 합니다.
+    """
+    task = asyncio.ensure_future(anyio.to_thread.run_sync(
+        partial(_run_in_scope, context, func, *args), limiter=_worker_limiter(context.priority)
+    ))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=settings.DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if not context.cancelled.is_set() and await http_request.is_disconnected():
+            context.cancel(REASON_DISCONNECTED)
+            metrics.inc("requests_cancelled_total", reason=REASON_DISCONNECTED)
+
+def _request_context(request: BaseModel, priority: str, timeout_ms: Optional[float]) -> RequestContext:
+    """
+    X-Request-Priority / X-Request-Timeout-Ms 헤더로 요청 정보를 만듭니다.
+    타임아웃 헤더가 없으면 REQUEST_DEFAULT_TIMEOUT_MS를 사용합니다. (0이면 제한 없음)
+    """
+    if timeout_ms is None:
+        timeout_ms = settings.REQUEST_DEFAULT_TIMEOUT_MS
+    return RequestContext.with_timeout(getattr(request, "session_id", None), priority, timeout_ms)
+
+def _capture(endpoint: str, request: BaseModel, response: Optional[BaseModel], started: float,
+             context: RequestContext) -> None:
+    """
+    캡처 모드일 때 요청과 응답을 트래픽 캡처 파일에 기록합니다. (실패 시 response=None, status=500)
+    """
+    if not traffic_capture.enabled:
+        return
+    traffic_capture.record_request(
+        endpoint=f"{router.prefix}{endpoint}",
+        payload=request.model_dump(),
+        response=response.model_dump() if response is not None else None,
+        status=200 if response is not None else 500,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        headers=_capture_headers(context),
+        arrived_at=context.arrived_at
+    )
+
+async def _store_result(endpoint: str, request: BaseModel, response: BaseModel, started: float,
+                        context: RequestContext, triage: TriageDecision, obsession_type: Optional[str] = None) -> None:
+    """
+    분석 결과를 분석용 저장소 큐에 넣습니다. 디스크 기록은 백그라운드 스레드가 모아서 처리합니다.
+    """
+    if not analytics_sink.enabled:
+        return
+    args = (
+        f"{router.prefix}{endpoint}", getattr(request, "session_id", None), response.model_dump(),
+        context.priority, "llm" if triage.needs_llm else triage.reason,
+        (time.perf_counter() - started) * 1000, obsession_type
+    )
+    #대부분은 큐에 자리가 있으므로 스레드풀을 거치지 않고 바로 넣음
+    if analytics_sink.try_record(*args):
+        return
+    if analytics_sink.blocking:
+        #큐가 가득 찼을 때만 자리가 날 때까지 이벤트 루프 밖에서 기다림
+        await run_in_threadpool(analytics_sink.record, *args)
+    else:
+        analytics_sink.record(*args)
+
+def _capture_headers(context: RequestContext) -> dict:
+    headers = {"X-Request-Priority": context.priority}
+    if context.timeout_ms is not None:
+        headers["X-Request-Timeout-Ms"] = str(context.timeout_ms)
+    return headers
 
 @router.post("/analyze", response_model=ObsessionAnalysisResponse)
-async def analyze_obsession(request: ObsessionAnalysisRequest):
+async def analyze_obsession(request: ObsessionAnalysisRequest, http_request: Request,
+                            x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                            x_request_timeout_ms: Optional[float] = Header(None)):
     """
     사용자의 텍스트를 분석하여 강박 관련 질문과 선택지를 생성합니다.
     """
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석 요청: {request.user_text[:50]}...")
         
-        # LLM을 통해 질문과 선택지 생성
-        raw_response = chatbot_service.generate_obsession_question(request.user_text)
+        # LLM을 통해 질문과 선택지 생성 (무의미한 입력은 기본 응답)
+        triage = input_triage.triage_text("/analyze", request.user_text)
+        if triage.needs_llm:
+            raw_response = await _call_service(http_request, context, chatbot_service.generate_obsession_question, request.user_text)
+        else:
+            raw_response = chatbot_service.fallback_response("question")
         
         # 응답 형식 가공
         formatted_response = format_obsession_question(raw_response)
         
         logger.info(f"강박 분석 완료: 질문 생성됨")
         
-        return ObsessionAnalysisResponse(
+        response = ObsessionAnalysisResponse(
             question=formatted_response["question"],
             choices=formatted_response["choices"],
             session_id=request.session_id
         )
+        _capture("/analyze", request, response, started, context)
+        await _store_result("/analyze", request, response, started, context, triage)
+        return response
         
     except Exception as e:
         logger.error(f"강박 분석 중 오류 발생: {e}")
+        _capture("/analyze", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
 
 @router.post("/analyze2", response_model=ObsessionAnalysis2Response)
-async def analyze_obsession2(request: ObsessionAnalysis2Request):
+async def analyze_obsession2(request: ObsessionAnalysis2Request, http_request: Request,
+                             x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                             x_request_timeout_ms: Optional[float] = Header(None)):
     """
     대화 히스토리를 분석하여 강박 행동에 대한 공감적 질문을 생성합니다.
     """
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석2 요청: session_id={request.session_id}")
         
-        # LLM을 통해 공감적 질문 생성
-        response = chatbot_service.generate_obsession_analysis2_response(request.conversation_history)
+        # LLM을 통해 공감적 질문 생성 (무의미한 입력은 기본 응답)
+        user_turns = chatbot_service.user_turns(request.conversation_history)
+        triage = input_triage.triage_messages(
+            "/analyze2", chatbot_service.recent_messages(user_turns, chatbot_service.recent_window)
+        )
+        if triage.needs_llm:
+            response = await _call_service(http_request, context, chatbot_service.generate_obsession_analysis2_response, request.conversation_history, user_turns)
+        else:
+            response = chatbot_service.fallback_response("analysis2")
         
         logger.info(f"강박 분석2 완료: 응답 생성됨")
         
-        return ObsessionAnalysis2Response(
+        result = ObsessionAnalysis2Response(
             session_id=request.session_id,
             response=response
         )
+        _capture("/analyze2", request, result, started, context)
+        await _store_result("/analyze2", request, result, started, context, triage)
+        return result
         
     except Exception as e:
         logger.error(f"강박 분석2 중 오류 발생: {e}")
+        _capture("/analyze2", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
 
 @router.post("/analyze3", response_model=ObsessionAnalysis3Response)
-async def analyze_obsession3(request: ObsessionAnalysis3Request):
+async def analyze_obsession3(request: ObsessionAnalysis3Request, http_request: Request,
+                             x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                             x_request_timeout_ms: Optional[float] = Header(None)):
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석3 요청: session_id={request.session_id}")
         
-        # LLM을 통해 패턴 요약과 생각 예시 생성
-        analysis_result = chatbot_service.generate_obsession_analysis3_response(request.conversation_history)
+        # LLM을 통해 패턴 요약과 생각 예시 생성 (무의미한 입력은 기본 응답)
+        user_turns = chatbot_service.user_turns(request.conversation_history)
+        triage = input_triage.triage_messages(
+            "/analyze3", chatbot_service.recent_messages(user_turns, chatbot_service.recent_window)
+        )
+        if triage.needs_llm:
+            analysis_result = await _call_service(http_request, context, chatbot_service.generate_obsession_analysis3_response, request.conversation_history, user_turns)
+        else:
+            analysis_result = chatbot_service.fallback_response("analysis3")
         
         logger.info(f"강박 분석3 완료: 응답 생성됨")
         
-        return ObsessionAnalysis3Response(
+        result = ObsessionAnalysis3Response(
             session_id=request.session_id,
             gratitude_message="자세히 말씀해주셔서 고마워요.",
             user_pattern_summary=analysis_result["user_pattern_summary"],
             question="혹시 이런 생각이 자주 떠오르진 않으시나요?",
             thought_examples=analysis_result["thought_examples"]
         )
+        _capture("/analyze3", request, result, started, context)
+        await _store_result("/analyze3", request, result, started, context, triage)
+        return result
     except Exception as e:
         logger.error(f"강박 분석3 중 오류 발생: {e}")
+        _capture("/analyze3", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
 
 @router.post("/analyze4", response_model=ObsessionAnalysis4Response)
-async def analyze_obsession4(request: ObsessionAnalysis4Request):
+async def analyze_obsession4(request: ObsessionAnalysis4Request, http_request: Request,
+                             x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                             x_request_timeout_ms: Optional[float] = Header(None)):
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석4 요청: session_id={request.session_id}")
         
-        # LLM을 통해 강박 유형별 맞춤 응답 생성
-        analysis_result = chatbot_service.generate_obsession_analysis4_response(request.conversation_history)
+        # LLM을 통해 강박 유형별 맞춤 응답 생성 (무의미한 입력은 기본 응답)
+        user_turns = chatbot_service.user_turns(request.conversation_history)
+        triage = input_triage.triage_messages(
+            "/analyze4", chatbot_service.recent_messages(user_turns, chatbot_service.recent_window),
+            #기본 응답은 "other" 유형이므로 중복 전송으로 유형이 바뀌지 않게 LLM으로 처리
+            detect_duplicates=False
+        )
+        if triage.needs_llm:
+            analysis_result = await _call_service(http_request, context, chatbot_service.generate_obsession_analysis4_response, request.conversation_history, user_turns)
+        else:
+            analysis_result = chatbot_service.fallback_response("analysis4")
         
         logger.info(f"강박 분석4 완료: 응답 생성됨 (카테고리: {analysis_result.get('obsession_type', 'unknown')})")
         
-        return ObsessionAnalysis4Response(
+        result = ObsessionAnalysis4Response(
             session_id=request.session_id,
             user_pattern_summary=analysis_result["user_pattern_summary"],
             category_message=analysis_result["category_message"],
             encouragement=analysis_result["encouragement"]
         )
+        _capture("/analyze4", request, result, started, context)
+        await _store_result("/analyze4", request, result, started, context, triage,
+                            obsession_type=analysis_result.get("obsession_type"))
+        return result
     except Exception as e:
         logger.error(f"강박 분석4 중 오류 발생: {e}")
+        _capture("/analyze4", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
 
 
 @router.post("/analyze5", response_model=ObsessionAnalysis5Response)
-async def analyze_obsession5(request: ObsessionAnalysis5Request):
+async def analyze_obsession5(request: ObsessionAnalysis5Request, http_request: Request,
+                             x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                             x_request_timeout_ms: Optional[float] = Header(None)):
     """
     대화 히스토리를 바탕으로 280자 이내의 자각을 돕는 질문을 생성합니다.
     """
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석5 요청: session_id={request.session_id}")
-        response = chatbot_service.generate_obsession_analysis5_response(request.conversation_history)
+        user_turns = chatbot_service.user_turns(request.conversation_history)
+        triage = input_triage.triage_messages(
+            "/analyze5", chatbot_service.recent_messages(user_turns, chatbot_service.recent_window)
+        )
+        if triage.needs_llm:
+            response = await _call_service(http_request, context, chatbot_service.generate_obsession_analysis5_response, request.conversation_history, user_turns)
+        else:
+            response = chatbot_service.fallback_response("analysis5")
         logger.info("강박 분석5 완료: 응답 생성됨")
-        return ObsessionAnalysis5Response(
+        result = ObsessionAnalysis5Response(
             session_id=request.session_id,
             response=response
         )
+        _capture("/analyze5", request, result, started, context)
+        await _store_result("/analyze5", request, result, started, context, triage)
+        return result
     except Exception as e:
         logger.error(f"강박 분석5 중 오류 발생: {e}")
+        _capture("/analyze5", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
 
 @router.get("/health")
@@ -126,18 +322,33 @@ async def health_check():
     return {"status": "healthy", "service": "obsession-analysis"} 
 
 @router.post("/analyze6", response_model=ObsessionAnalysis6Response)
-async def analyze_obsession6(request: ObsessionAnalysis6Request):
+async def analyze_obsession6(request: ObsessionAnalysis6Request, http_request: Request,
+                             x_request_priority: str = Header(PRIORITY_INTERACTIVE),
+                             x_request_timeout_ms: Optional[float] = Header(None)):
     """
     LLM으로 공감적 도입부를 생성하고, 불안 위계로 전환하게끔 함.
     """
+    started = time.perf_counter()
+    context = _request_context(request, x_request_priority, x_request_timeout_ms)
     try:
         logger.info(f"강박 분석6 요청: session_id={request.session_id}")
-        response = chatbot_service.generate_obsession_analysis6_response(request.conversation_history)
+        user_turns = chatbot_service.user_turns(request.conversation_history)
+        triage = input_triage.triage_messages(
+            "/analyze6", chatbot_service.recent_messages(user_turns, chatbot_service.recent_window)
+        )
+        if triage.needs_llm:
+            response = await _call_service(http_request, context, chatbot_service.generate_obsession_analysis6_response, request.conversation_history, user_turns)
+        else:
+            response = chatbot_service.fallback_response("analysis6")
         logger.info("강박 분석6 완료: 응답 생성됨")
-        return ObsessionAnalysis6Response(
+        result = ObsessionAnalysis6Response(
             session_id=request.session_id,
             response=response
         )
+        _capture("/analyze6", request, result, started, context)
+        await _store_result("/analyze6", request, result, started, context, triage)
+        return result
     except Exception as e:
         logger.error(f"강박 분석6 중 오류 발생: {e}")
+        _capture("/analyze6", request, None, started, context)
         raise HTTPException(status_code=500, detail="서버 내부 오류가 발생했습니다.")
\ No newline at end of file
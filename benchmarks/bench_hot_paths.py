@@ -0,0 +1,247 @@
+"""
+LLM 호출을 제외한 요청 처리 경로(CPU)의 마이크로벤치마크입니다.
+
+1 ~ 10,000개 메시지의 합성 대화 히스토리(str/list/dict content 혼합)로 아래 경로를 측정합니다.
+- Pydantic 요청 검증 (conversation_history)
+- 사용자 메시지 추출 (recent_user_messages, user_turns)
+- 문자열 결합
+- 세션 요약 조회 (_with_session_summary, 요약이 이미 최신인 상태)
+- analyze5/6 프롬프트 작성 (user_turns + _cached_pattern + _analysis_prompt, 패턴 재사용 상태)
+- LLM 응답 JSON 추출
+- format_obsession_question
+
+사용 예:
+    python -m benchmarks.bench_hot_paths --output bench.json
+    python -m benchmarks.bench_hot_paths --check benchmarks/baseline.json
+    python -m benchmarks.bench_hot_paths --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from typing import Any, Callable, Dict, List
+
+#ChatOpenAI 생성에 API 키가 필요하지만 벤치마크는 LLM을 호출하지 않음
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+#요약 갱신(백그라운드 LLM 호출)이 측정에 끼어들지 않도록 비활성화
+os.environ.setdefault("CONVERSATION_SUMMARY_ENABLED", "false")
+
+from formatters.obsession_formatter import format_obsession_question  # noqa: E402
+from models.request import ObsessionAnalysis2Request  # noqa: E402
+from services.chatbot_service import ChatbotService  # noqa: E402
+from services.conversation_summary import ConversationSummaryStore  # noqa: E402
+from services.pattern_analysis import PatternAnalysis, PatternAnalysisStore  # noqa: E402
+from services.request_context import RequestContext, request_scope  # noqa: E402
+
+HISTORY_SIZES = (1, 10, 100, 1000, 10000)
+DEFAULT_TOLERANCE = 0.5
+#이보다 작은 절대 차이는 측정 잡음으로 간주
+DEFAULT_MIN_DELTA_US = 5.0
+
+_SAMPLE_SENTENCES = [
+    "손이 더럽다고 느껴서 계속 씻어야 해요",
+    "문을 잠갔는지 계속 확인해요",
+    "가스를 끄지 않았나 걱정돼요",
+    "모든 것이 완벽해야 한다는 생각이 들어요",
+    "외출할 때마다 불안해요 😥",
+]
+
+
+def make_history(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    user/assistant가 번갈아 나오고, user content는 str/list/dict가 섞인 히스토리를 만듭니다.
+    """
+    rng = random.Random(seed)
+    history = []
+    for i in range(size):
+        if i % 2:
+            history.append({"role": "assistant", "content": "말씀해주셔서 감사해요. 조금 더 이야기해주실 수 있을까요?"})
+            continue
+        kind = i // 2 % 3
+        sentence = rng.choice(_SAMPLE_SENTENCES)
+        if kind == 0:
+            content: Any = sentence
+        elif kind == 1:
+            content = [sentence, rng.choice(_SAMPLE_SENTENCES)]
+        else:
+            content = {"text": sentence, "mood": rng.randint(1, 5)}
+        history.append({"role": "user", "content": content})
+    return history
+
+
+LLM_JSON_RESPONSE = (
+    "다음과 같이 정리했어요.\n"
+    '{"question": "문을 잠갔는지 확인하고 싶을 때, 주로 언제 그런 생각이 드나요?", '
+    '"choices": ["외출할 때", "잠자리에 들 때", "불안감이 높을 때"]}'
+)
+
+
+BENCH_PATTERN = PatternAnalysis(
+    trigger="외출할 때", behaviour="문을 잠갔는지 반복해서 확인", category="checking",
+    summary="당신은 문을 제대로 잠갔는지 걱정이 되어 반복적으로 확인하는 경향이 있는 것 같아요."
+)
+
+
+def _in_session(session_id: str, func: Callable[[], Any]) -> Callable[[], Any]:
+    context = RequestContext(session_id=session_id)
+
+    def call():
+        with request_scope(context):
+            return func()
+    return call
+
+
+def _prepare_sessions(service: ChatbotService) -> None:
+    """
+    요약과 패턴 저장소를 LLM 호출 없이 동작하게 바꿉니다. (요약은 요청 스레드에서 고정 문자열로 갱신)
+    """
+    service.conversation_summaries = ConversationSummaryStore(
+        summarize=lambda session_id, previous, new_messages: "외출 전 문 잠금을 여러 번 확인한다고 말함",
+        stringify=service._stringify_message_content,
+        window=service.recent_window,
+        run_inline=True
+    )
+    service.pattern_analyses = PatternAnalysisStore(window=service.recent_window)
+
+
+def build_cases(service: ChatbotService) -> Dict[str, Callable[[], Any]]:
+    _prepare_sessions(service)
+    window = service.recent_window
+    cases: Dict[str, Callable[[], Any]] = {}
+    for size in HISTORY_SIZES:
+        history = make_history(size)
+        session_id = f"bench-{size}"
+        payload = {"conversation_history": history, "session_id": session_id}
+        recent = service.recent_user_messages(history, window)
+        user_turns = service.user_turns(history)
+        #요약을 최신 상태로 만들고 패턴을 저장해 두어, 측정은 반복 요청의 경로만 포함
+        with request_scope(RequestContext(session_id=session_id)):
+            service._with_session_summary("", user_turns)
+            service._store_pattern(user_turns, BENCH_PATTERN)
+
+        cases[f"validate_request[n={size}]"] = lambda payload=payload: ObsessionAnalysis2Request.model_validate(payload)
+        cases[f"recent_user_messages[n={size}]"] = lambda history=history: service.recent_user_messages(history, window)
+        cases[f"user_turns[n={size}]"] = lambda history=history: service.user_turns(history)
+        cases[f"with_session_summary[n={size}]"] = _in_session(
+            session_id, lambda recent=recent, user_turns=user_turns: service._with_session_summary(
+                f"대화 히스토리: {' '.join(recent)}", user_turns
+            )
+        )
+        cases[f"analysis_prompt[n={size}]"] = _in_session(session_id, lambda history=history: _analysis_prompt(service, history))
+        cases[f"join_recent_context[n={size}]"] = lambda recent=recent: f"대화 히스토리: {' '.join(recent)}"
+
+    cases["extract_json"] = lambda: service._extract_json(LLM_JSON_RESPONSE)
+    raw_question = service._extract_json(LLM_JSON_RESPONSE)
+    cases["format_obsession_question"] = lambda: format_obsession_question(raw_question)
+    return cases
+
+
+def _analysis_prompt(service: ChatbotService, history: List[Dict[str, Any]]) -> str:
+    #generate_obsession_analysis5_response / 6 과 같은 순서
+    user_turns = service.user_turns(history)
+    return service._analysis_prompt("최근 사용자 맥락", user_turns, service._cached_pattern(user_turns))
+
+
+def measure(func: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    한 번의 측정이 min_time 이상 걸리도록 반복 횟수를 정한 뒤 repeat번 측정해 호출당 시간(us)을 계산합니다.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    samples = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "max_us": round(max(samples), 3),
+        "iterations": number,
+    }
+
+
+def run(repeat: int, min_time: float, pattern: str = "") -> Dict[str, Any]:
+    service = ChatbotService()
+    try:
+        cases = build_cases(service)
+        results = {}
+        for name, func in cases.items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = measure(func, repeat, min_time)
+            print(f"{name:45s} {results[name]['median_us']:>14.3f} us", file=sys.stderr)
+    finally:
+        service.close()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def check_regressions(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                      min_delta_us: float = DEFAULT_MIN_DELTA_US) -> List[str]:
+    """
+    기준선 대비 tolerance 비율과 min_delta_us 이상 느려진 항목을 반환합니다.
+    잡음에 덜 민감하도록 반복 측정 중 최솟값(min_us)끼리 비교합니다.
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        result = current["results"].get(name)
+        if result is None:
+            continue
+        delta = result["min_us"] - base["min_us"]
+        if result["min_us"] > base["min_us"] * (1 + tolerance) and delta > min_delta_us:
+            regressions.append(
+                f"{name}: {result['min_us']:.3f}us > {base['min_us']:.3f}us (+{tolerance:.0%} 허용)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU 경로 마이크로벤치마크")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.1, help="측정 1회의 최소 시간(초)")
+    parser.add_argument("-k", dest="pattern", default="", help="이름에 이 문자열이 포함된 항목만 실행")
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본: stdout)")
+    parser.add_argument("--check", help="비교할 기준선 JSON 파일 경로")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="허용 성능 저하 비율")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US, help="무시할 절대 차이(us)")
+    parser.add_argument("--save-baseline", help="결과를 기준선으로 저장할 경로")
+    args = parser.parse_args()
+
+    current = run(args.repeat, args.min_time, args.pattern)
+    output = json.dumps(current, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check_regressions(current, baseline, args.tolerance, args.min_delta_us)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
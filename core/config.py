@@ -11,10 +11,72 @@ class Settings:
     # LLM 설정
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+    # 분류처럼 짧은 작업에 쓰는 작고 빠른 모델
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-4o-mini")
+    # task별 생성 프로필 덮어쓰기 (JSON), 예: {"categorize": {"model": "gpt-4o-mini"}}
+    LLM_PROFILE_OVERRIDES: str = os.getenv("LLM_PROFILE_OVERRIDES", "")
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    
+    # LLM HTTP 커넥션 풀 설정
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120"))
+    LLM_HTTP_CONNECT_TIMEOUT: float = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+    LLM_HTTP_WARMUP_CONNECTIONS: int = int(os.getenv("LLM_HTTP_WARMUP_CONNECTIONS", "2"))
+    
+    # LLM 호출 스케줄러 설정 (클래스별 동시 실행 한도 = 현재 전체 한도 * share)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+    LLM_INTERACTIVE_SHARE: float = float(os.getenv("LLM_INTERACTIVE_SHARE", "1.0"))
+    LLM_BACKGROUND_SHARE: float = float(os.getenv("LLM_BACKGROUND_SHARE", "0.25"))
+    # 적응형 동시 실행 한도 (gradient / aimd / fixed), 적응형일 때 LLM_MAX_CONCURRENCY는 상한
+    LLM_CONCURRENCY_LIMITER: str = os.getenv("LLM_CONCURRENCY_LIMITER", "gradient")
+    LLM_MIN_CONCURRENCY: int = int(os.getenv("LLM_MIN_CONCURRENCY", "2"))
+    LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+    LLM_AIMD_LATENCY_THRESHOLD: float = float(os.getenv("LLM_AIMD_LATENCY_THRESHOLD", "10.0"))
+    #우선순위별 작업 스레드 수 (LLM 자리를 기다리는 스레드도 포함하므로 interactive는 LLM_MAX_CONCURRENCY보다 크게)
+    LLM_INTERACTIVE_WORKER_THREADS: int = int(os.getenv("LLM_INTERACTIVE_WORKER_THREADS", "128"))
+    LLM_BACKGROUND_WORKER_THREADS: int = int(os.getenv("LLM_BACKGROUND_WORKER_THREADS", "16"))
+    
+    # 마감 시간 기반 degradation 설정
+    LLM_INITIAL_LATENCY_ESTIMATE: float = float(os.getenv("LLM_INITIAL_LATENCY_ESTIMATE", "2.0"))
+    #남은 시간이 예상 지연보다 짧은 요청이라도 task별로 이 간격(초)마다 한 번은 실제로 호출해 지연을 다시 잼
+    LLM_LATENCY_PROBE_INTERVAL: float = float(os.getenv("LLM_LATENCY_PROBE_INTERVAL", "5.0"))
+    LLM_COMPLETION_CACHE_SIZE: int = int(os.getenv("LLM_COMPLETION_CACHE_SIZE", "1000"))
+    #X-Request-Timeout-Ms 헤더가 없을 때의 요청 타임아웃 (0이면 제한 없음)
+    REQUEST_DEFAULT_TIMEOUT_MS: float = float(os.getenv("REQUEST_DEFAULT_TIMEOUT_MS", "0"))
+    #클라이언트 연결 끊김 확인 주기(초)
+    DISCONNECT_POLL_INTERVAL: float = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.1"))
+    
+    # 세션별 누적 대화 요약 설정 (최근 WINDOW개보다 오래된 사용자 메시지를 요약)
+    CONVERSATION_SUMMARY_ENABLED: bool = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").lower() == "true"
+    #analyze2 ~ analyze6, 채팅 프롬프트에 원문으로 들어가는 최근 사용자 메시지 수와 같은 값
+    CONVERSATION_SUMMARY_WINDOW: int = int(os.getenv("CONVERSATION_SUMMARY_WINDOW", "5"))
+    CONVERSATION_SUMMARY_MAX_CHARS: int = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", "500"))
+    CONVERSATION_SUMMARY_MAX_SESSIONS: int = int(os.getenv("CONVERSATION_SUMMARY_MAX_SESSIONS", "10000"))
+    
+    # 세션별 패턴 분석 재사용 설정 (analyze3 ~ analyze6)
+    PATTERN_ANALYSIS_ENABLED: bool = os.getenv("PATTERN_ANALYSIS_ENABLED", "true").lower() == "true"
+    PATTERN_ANALYSIS_MAX_SESSIONS: int = int(os.getenv("PATTERN_ANALYSIS_MAX_SESSIONS", "10000"))
     
     # FAISS 설정
     FAISS_INDEX_PATH: str = os.getenv("FAISS_INDEX_PATH", "./data/faiss_index")
     
+    # 트래픽 캡처/리플레이 설정
+    TRAFFIC_CAPTURE_ENABLED: bool = os.getenv("TRAFFIC_CAPTURE_ENABLED", "false").lower() == "true"
+    TRAFFIC_CAPTURE_PATH: str = os.getenv("TRAFFIC_CAPTURE_PATH", "requests.jsonl")
+    TRAFFIC_CAPTURE_QUEUE_SIZE: int = int(os.getenv("TRAFFIC_CAPTURE_QUEUE_SIZE", "10000"))
+    TRAFFIC_REPLAY_PATH: str = os.getenv("TRAFFIC_REPLAY_PATH", "")
+    
+    # 분석 결과 저장 설정 (write-behind, SQLite), 큐가 가득 차면 drop 또는 block
+    ANALYTICS_SINK_ENABLED: bool = os.getenv("ANALYTICS_SINK_ENABLED", "false").lower() == "true"
+    ANALYTICS_SINK_PATH: str = os.getenv("ANALYTICS_SINK_PATH", "analytics.db")
+    ANALYTICS_SINK_QUEUE_SIZE: int = int(os.getenv("ANALYTICS_SINK_QUEUE_SIZE", "10000"))
+    ANALYTICS_SINK_BATCH_SIZE: int = int(os.getenv("ANALYTICS_SINK_BATCH_SIZE", "200"))
+    ANALYTICS_SINK_FLUSH_INTERVAL: float = float(os.getenv("ANALYTICS_SINK_FLUSH_INTERVAL", "1.0"))
+    ANALYTICS_SINK_FULL_POLICY: str = os.getenv("ANALYTICS_SINK_FULL_POLICY", "drop")
+    ANALYTICS_SINK_BLOCK_TIMEOUT: float = float(os.getenv("ANALYTICS_SINK_BLOCK_TIMEOUT", "1.0"))
+    
     # 로깅 설정
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
@@ -0,0 +1,127 @@
+"""
+캡처된 트래픽(JSONL)을 앱에 다시 보내 성능과 응답 일치 여부를 확인합니다.
+
+사용 예:
+    # 1) 리플레이 모드로 앱 실행 (LLM 응답은 캡처 파일에서 제공)
+    TRAFFIC_REPLAY_PATH=requests.jsonl python app.py
+
+    # 2) 원래 속도의 4배로 리플레이
+    python -m scripts.replay_traffic requests.jsonl --rate 4
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("type") == "request":
+                records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def replay_one(client: httpx.AsyncClient, prefix: str, record: Dict[str, Any], delay: float) -> Dict[str, Any]:
+    await asyncio.sleep(delay)
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"{prefix}{record['endpoint']}", json=record["payload"],
+                                     headers=record.get("headers") or {})
+        status = response.status_code
+        body = response.json() if status == 200 else None
+    except httpx.HTTPError as e:
+        return {"endpoint": record["endpoint"], "error": str(e), "latency_ms": (time.perf_counter() - started) * 1000}
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {
+        "endpoint": record["endpoint"],
+        "status": status,
+        "expected_status": record["status"],
+        "latency_ms": latency_ms,
+        "captured_latency_ms": record["latency_ms"],
+        "match": status == record["status"] and body == record["response"],
+    }
+
+
+async def replay(records: List[Dict[str, Any]], base_url: str, prefix: str, rate: float, timeout: float) -> List[Dict[str, Any]]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        t0 = records[0]["ts"]
+        tasks = [
+            replay_one(client, prefix, record, (record["ts"] - t0) / rate)
+            for record in records
+        ]
+        return await asyncio.gather(*tasks)
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    latencies = [r["latency_ms"] for r in results if "error" not in r]
+    captured = [r["captured_latency_ms"] for r in results if "error" not in r]
+    return {
+        "sent": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "mismatches": sum(1 for r in results if "error" not in r and not r["match"]),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+        },
+        "captured_latency_ms": {
+            "p50": round(percentile(captured, 50), 3),
+            "p95": round(percentile(captured, 95), 3),
+            "p99": round(percentile(captured, 99), 3),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캡처된 트래픽을 앱에 리플레이합니다.")
+    parser.add_argument("capture", help="트래픽 캡처 JSONL 파일 경로")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--prefix", default="/api/v1", help="API 경로 접두사")
+    parser.add_argument("--rate", type=float, default=1.0, help="원래 속도 대비 배수 (2 = 두 배 빠르게)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="요청별 결과를 기록할 JSONL 파일 경로")
+    args = parser.parse_args()
+
+    records = load_requests(args.capture)
+    if not records:
+        print(json.dumps({"sent": 0}))
+        return
+
+    started = time.perf_counter()
+    results = asyncio.run(replay(records, args.base_url, args.prefix, args.rate, args.timeout))
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    summary = summarize(results, elapsed)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if summary["errors"] or summary["mismatches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
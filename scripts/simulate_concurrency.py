@@ -0,0 +1,153 @@
+"""
+가상 LLM 백엔드로 LLM 호출 스케줄러의 동시 실행 한도 알고리즘을 시험합니다.
+
+가상 백엔드는 capacity개까지만 동시에 처리하고 나머지는 내부에서 줄을 세우므로,
+capacity를 넘는 동시 호출은 처리량은 그대로인 채 지연 시간만 늘립니다.
+동시 호출이 capacity * overload_factor를 넘으면 과부하 오류(429와 같은)를 돌려줍니다.
+구간(phase)마다 capacity와 기본 지연을 바꿔 업스트림 상태 변화에 한도가 따라가는지 확인합니다.
+
+사용 예:
+    python -m scripts.simulate_concurrency
+    python -m scripts.simulate_concurrency --algorithm aimd --clients 128
+    python -m scripts.simulate_concurrency --phases 5:8:0.05,5:32:0.05,5:4:0.2
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from core.config import settings
+from services.concurrency_limit import limit_from_settings
+from services.llm_scheduler import LLMScheduler
+from services.request_context import PRIORITY_INTERACTIVE
+
+
+class SimulatedOverload(Exception):
+    pass
+
+
+class SimulatedBackend:
+    def __init__(self, capacity: int, base_latency: float, overload_factor: float = 4.0, jitter: float = 0.2):
+        self.overload_factor = overload_factor
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.configure(capacity, base_latency)
+
+    def configure(self, capacity: int, base_latency: float) -> None:
+        with self._lock:
+            self.capacity = capacity
+            self.base_latency = base_latency
+            self._workers = threading.BoundedSemaphore(capacity)
+
+    def call(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity * self.overload_factor:
+                raise SimulatedOverload("too many requests")
+            self._in_flight += 1
+            workers, latency = self._workers, self.base_latency
+        try:
+            with workers:
+                time.sleep(latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+def parse_phases(value: str) -> List[Tuple[float, int, float]]:
+    """
+    "초:capacity:기본지연,..." 형식을 [(duration, capacity, base_latency), ...]로 바꿉니다.
+    """
+    phases = []
+    for part in value.split(","):
+        duration, capacity, latency = part.split(":")
+        phases.append((float(duration), int(capacity), float(latency)))
+    return phases
+
+
+def simulate(algorithm: str, clients: int, phases: List[Tuple[float, int, float]]) -> List[Dict[str, Any]]:
+    scheduler = LLMScheduler(settings.LLM_MAX_CONCURRENCY, limit=limit_from_settings(algorithm))
+    backend = SimulatedBackend(phases[0][1], phases[0][2])
+    stop = threading.Event()
+    lock = threading.Lock()
+    #현재 구간의 측정값
+    window: Dict[str, Any] = {}
+
+    def reset_window():
+        with lock:
+            window.update(ok=0, errors=0, latencies=[], limits=[], queued=[])
+
+    def client(index: int):
+        session_id = f"sim-{index}"
+        while not stop.is_set():
+            started = time.perf_counter()
+            with scheduler.slot(PRIORITY_INTERACTIVE, session_id):
+                call_started = time.perf_counter()
+                try:
+                    backend.call()
+                    ok = True
+                except SimulatedOverload:
+                    ok = False
+                scheduler.record_call(time.perf_counter() - call_started, ok, key="sim")
+            with lock:
+                window["ok" if ok else "errors"] += 1
+                if ok:
+                    window["latencies"].append(time.perf_counter() - started)
+            if not ok:
+                time.sleep(0.01)
+
+    def sampler():
+        while not stop.is_set():
+            stats = scheduler.stats()[PRIORITY_INTERACTIVE]
+            with lock:
+                window["limits"].append(scheduler.max_concurrency)
+                window["queued"].append(stats["queued"])
+            time.sleep(0.05)
+
+    reset_window()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    threads.append(threading.Thread(target=sampler, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    results = []
+    for duration, capacity, latency in phases:
+        backend.configure(capacity, latency)
+        reset_window()
+        time.sleep(duration)
+        with lock:
+            latencies = sorted(window["latencies"])
+            results.append({
+                "capacity": capacity,
+                "base_latency_ms": latency * 1000,
+                "ideal_throughput": round(capacity / latency, 1),
+                "throughput": round(window["ok"] / duration, 1),
+                "errors": window["errors"],
+                "p50_ms": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+                "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+                "avg_limit": round(statistics.mean(window["limits"]), 1) if window["limits"] else None,
+                "final_limit": scheduler.max_concurrency,
+                "avg_queued": round(statistics.mean(window["queued"]), 1) if window["queued"] else None,
+            })
+    stop.set()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가상 백엔드로 동시 실행 한도 알고리즘을 시험합니다.")
+    parser.add_argument("--algorithm", default=settings.LLM_CONCURRENCY_LIMITER, help="gradient / aimd / fixed")
+    parser.add_argument("--clients", type=int, default=64, help="동시에 호출하는 클라이언트 수")
+    parser.add_argument("--phases", default="5:8:0.05,5:32:0.05,5:4:0.1",
+                        help="구간 목록 (초:capacity:기본지연(초),...)")
+    args = parser.parse_args()
+
+    results = simulate(args.algorithm, args.clients, parse_phases(args.phases))
+    print(json.dumps({"algorithm": args.algorithm, "clients": args.clients, "phases": results},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from core.logging import get_logger
+from core.metrics import metrics
+from services.traffic_capture import sanitize_payload, sanitize_session_id
+
+logger = get_logger(__name__)
+
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+
+_STOP = object()
+
+_COLUMNS = ("ts", "endpoint", "session_id", "priority", "source", "latency_ms",
+            "obsession_type", "user_pattern_summary", "result")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    endpoint TEXT NOT NULL,
+    session_id TEXT,
+    priority TEXT,
+    source TEXT,
+    latency_ms REAL,
+    obsession_type TEXT,
+    user_pattern_summary TEXT,
+    result TEXT NOT NULL
+)
+"""
+
+
+class AnalyticsSink:
+    """
+    분석 결과를 제품 분석용 SQLite 파일에 write-behind 방식으로 저장합니다.
+
+    요청 경로에서는 제한된 크기의 메모리 큐에 넣기만 하고, 백그라운드 스레드가
+    batch_size개가 모이거나 flush_interval초가 지날 때마다 한 트랜잭션으로 기록합니다.
+    큐가 가득 차면 policy에 따라 버리거나(drop) block_timeout초까지 기다립니다(block).
+    쓰기 스레드가 죽으면 다음 record()에서 다시 시작합니다.
+    close()는 큐에 남은 결과를 모두 기록한 뒤 종료하며, 종료가 멈추지 않도록 timeout을 둡니다.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, queue_size: int = 10000, batch_size: int = 200,
+                 flush_interval: float = 1.0, policy: str = POLICY_DROP, block_timeout: float = 1.0):
+        self.path = path
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            logger.error(f"알 수 없는 분석 결과 저장 정책: {policy}, drop 사용")
+            policy = POLICY_DROP
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def blocking(self) -> bool:
+        """
+        record()가 호출 스레드를 멈출 수 있는지 여부. (이벤트 루프에서는 스레드풀로 넘겨 호출)
+        """
+        return self.enabled and self.policy == POLICY_BLOCK
+
+    def record(self, endpoint: str, session_id: Optional[str], result: Dict[str, Any], priority: str = "",
+               source: str = "", latency_ms: float = 0.0, obsession_type: Optional[str] = None) -> bool:
+        """
+        분석 결과 하나를 큐에 넣습니다. 버려졌으면 False를 반환합니다.
+        """
+        if not self.enabled:
+            return False
+        row = self._row(endpoint, session_id, result, priority, source, latency_ms, obsession_type)
+        self._ensure_writer()
+        try:
+            if self.policy == POLICY_BLOCK:
+                self._queue.put(row, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("analytics_sink_dropped_total", policy=self.policy)
+            logger.warning(f"분석 결과 저장 큐가 가득 차 결과를 버립니다 (누적 {self.dropped}건)")
+            return False
+        metrics.inc("analytics_sink_enqueued_total", endpoint=endpoint)
+        return True
+
+    def try_record(self, endpoint: str, session_id: Optional[str], result: Dict[str, Any], priority: str = "",
+                   source: str = "", latency_ms: float = 0.0, obsession_type: Optional[str] = None) -> bool:
+        """
+        기다리지 않고 큐에 넣어 봅니다. 큐가 가득 차면 버리지 않고 False를 반환하므로
+        호출한 쪽에서 record()로 다시 넣을 수 있습니다.
+        """
+        if not self.enabled:
+            return False
+        row = self._row(endpoint, session_id, result, priority, source, latency_ms, obsession_type)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            return False
+        metrics.inc("analytics_sink_enqueued_total", endpoint=endpoint)
+        return True
+
+    @staticmethod
+    def _row(endpoint: str, session_id: Optional[str], result: Dict[str, Any], priority: str,
+             source: str, latency_ms: float, obsession_type: Optional[str]) -> Dict[str, Any]:
+        return {
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "session_id": session_id,
+            "priority": priority,
+            "source": source,
+            "latency_ms": round(latency_ms, 3),
+            "obsession_type": obsession_type,
+            "result": result,
+        }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        큐에 남은 결과를 모두 기록한 뒤 쓰기 스레드를 종료합니다.
+        쓰기 스레드가 이미 죽었거나 timeout초 안에 끝나지 않으면 남은 결과를 버리고 돌아옵니다.
+        """
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is None:
+            return
+        deadline = time.monotonic() + timeout
+        if writer.is_alive():
+            try:
+                #큐가 가득 차 있으면 쓰기 스레드가 자리를 비울 때까지만 기다림
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            writer.join(max(0.0, deadline - time.monotonic()))
+        if writer.is_alive():
+            logger.error(f"분석 결과 저장 스레드가 {timeout}초 안에 끝나지 않았습니다")
+        lost = len(self._drain())
+        if lost:
+            metrics.inc("analytics_sink_dropped_total", lost, policy="shutdown")
+            logger.error(f"종료 시 기록하지 못한 분석 결과 {lost}건을 버립니다")
+
+    def _ensure_writer(self) -> None:
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            if self._writer is not None:
+                #예기치 않은 오류로 쓰기 스레드가 죽었으면 새로 시작 (큐에 남은 결과는 새 스레드가 기록)
+                metrics.inc("analytics_sink_writer_restarts_total")
+                logger.error("분석 결과 저장 스레드가 종료되어 다시 시작합니다")
+            self._writer = threading.Thread(target=self._write_loop, name="analytics-sink", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        #sqlite 연결은 만든 스레드에서만 사용
+        try:
+            conn = sqlite3.connect(self.path)
+        except Exception as e:
+            logger.error(f"분석 결과 저장 파일을 열 수 없습니다: {e}")
+            return
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._flush(conn, batch)
+        except Exception as e:
+            logger.error(f"분석 결과 저장 스레드 오류: {e}")
+        finally:
+            conn.close()
+
+    def _next_batch(self):
+        """
+        첫 결과가 들어온 뒤 batch_size개가 모이거나 flush_interval초가 지날 때까지 모읍니다.
+        종료 신호를 받으면 큐에 남은 결과까지 모아 (batch, True)를 반환합니다.
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return self._drain(), True
+        batch = [first]
+        flush_at = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = flush_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch + self._drain(), True
+            batch.append(row)
+        return batch, False
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            if row is not _STOP:
+                rows.append(row)
+
+    def _flush(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            values = [self._to_row(row) for row in batch]
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO analysis_results ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    values
+                )
+            outcome = "ok"
+            metrics.inc("analytics_sink_rows_written_total", len(batch))
+        except Exception as e:
+            #기록 실패가 쓰기 스레드를 멈추지 않도록 배치만 버림
+            outcome = "error"
+            metrics.inc("analytics_sink_dropped_total", len(batch), policy="write_error")
+            logger.error(f"분석 결과 {len(batch)}건 저장 실패: {e}")
+        metrics.observe("analytics_sink_flush_seconds", time.perf_counter() - started, outcome=outcome)
+        metrics.observe("analytics_sink_batch_size", len(batch))
+        metrics.set_gauge("analytics_sink_queue_depth", self._queue.qsize())
+
+    @staticmethod
+    def _to_row(row: Dict[str, Any]) -> tuple:
+        #캡처와 같은 기준으로 session_id는 해시로, 사용자 발화가 섞일 수 있는 텍스트는 마스킹
+        result = sanitize_payload(row["result"])
+        return (
+            row["ts"],
+            row["endpoint"],
+            sanitize_session_id(row["session_id"]),
+            row["priority"],
+            row["source"],
+            row["latency_ms"],
+            row["obsession_type"],
+            result.get("user_pattern_summary"),
+            json.dumps(result, ensure_ascii=False),
+        )
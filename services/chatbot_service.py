@@ -1,10 +1,21 @@
 import uuid
 import json
-from typing import List, Dict, Any
+import time
+import openai
+from typing import List, Dict, Any, Callable, Optional, Tuple
 from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from core.config import settings
 from core.logging import get_logger
+from core.metrics import metrics
+from services.http_pool import LLMHttpPool
+from services.llm_profiles import GenerationProfile, load_profiles
+from services.llm_scheduler import LLMScheduler
+from services.request_context import RequestContext, current_context, request_scope, PRIORITY_BACKGROUND, DeadlineExceeded, REASON_DISCONNECTED
+from services.degradation import CompletionCache, LatencyEstimator
+from services.conversation_summary import ConversationSummaryStore
+from services.pattern_analysis import OBSESSION_TYPES, PatternAnalysis, PatternAnalysisStore
+from services.traffic_capture import TrafficCapture, ReplayCompletions, prompt_key
 
 logger = get_logger(__name__)
 
@@ -15,12 +26,223 @@ class ChatbotService:
     강박증, 불안, 우울 등 정신건강 관련 문제에 대해 전문적인 관점에서 답변하되,
     항상 전문의 상담을 권장하는 것을 잊지 마세요."""
     
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            model=settings.OPENAI_MODEL,
-            temperature=0.7
+    #LLM 호출 실패나 입력 분류(triage) 시 사용하는 기본 응답
+    FALLBACK_QUESTION_CHOICES = [
+        "스트레스가 있을 때",
+        "특정 상황에서", 
+        "불안감이 높을 때"
+    ]
+    FALLBACK_ANALYSIS2 = "말씀해주셔서 감사해요.\n혹시 그런 행동을 하면 불편했던 마음이\n좀 나아지나요?"
+    FALLBACK_PATTERN_SUMMARY = "당신은 불안감을 줄이기 위해 반복적인 행동을 하는 경향이 있는 것 같아요."
+    FALLBACK_THOUGHT_EXAMPLES = [
+        "이것을 하지 않으면 나쁜 일이 일어날 것 같아",
+        "확인하지 않으면 불안해져",
+        "완벽하지 않으면 실패할 것 같아"
+    ]
+    FALLBACK_ANALYSIS5 = (
+        "혹시, 방금 나눈 대화를 돌아보면 특정 상황에서 불안이 올라오고, "
+        "그 불안을 달래기 위해 어떤 행동을 반복하게 되는 흐름이 보일까요? "
+        "조금 더 자각이 생긴 부분이 있을까요?"
+    )
+    FALLBACK_ANALYSIS6_INTRO = (
+        "지금 느끼는 불안을 알아차리고 말해주는 것 자체가 큰 시작이에요. "
+        "우리는 그 과정을 함께 천천히 연습해볼 수 있어요."
+    )
+    ANALYSIS6_CLOSING = "먼저, 어떤 상황이 특히 불안했는지 정리하며 시작해볼까요?"
+    
+    #시간이 부족할 때 LLM 대신 쓰는 강박 유형 키워드 분류 기준
+    CONTAMINATION_KEYWORDS = ("씻", "세균", "오염", "더럽", "바이러스", "청소", "위생", "소독")
+    CHECKING_KEYWORDS = ("확인", "잠갔", "잠금", "잠그", "가스", "전원", "문단속", "껐", "끄지")
+    
+    def __init__(self, traffic_capture: Optional[TrafficCapture] = None,
+                 profiles: Optional[Dict[str, Dict[str, Any]]] = None,
+                 http_pool: Optional[LLMHttpPool] = None,
+                 scheduler: Optional[LLMScheduler] = None):
+        #모든 LLM 클라이언트가 공유하는 keep-alive 커넥션 풀
+        self.http_pool = http_pool or LLMHttpPool.from_settings()
+        #interactive/background 호출을 나눠 처리하는 스케줄러
+        self.scheduler = scheduler or LLMScheduler.from_settings()
+        #task(메서드)별 생성 프로필. profiles로 일부 필드를 덮어쓸 수 있음
+        self.profiles: Dict[str, GenerationProfile] = load_profiles(profiles)
+        self.default_profile = self.profiles["chat"]
+        #설정이 같은 프로필끼리는 LLM 클라이언트를 공유
+        self._llms: Dict[tuple, ChatOpenAI] = {}
+        self.llm = self._get_llm(self.default_profile)
+        self.traffic_capture = traffic_capture
+        #마감 시간이 빠듯할 때 사용할 task별 지연 추정치와 최근 응답 캐시
+        self.latency_estimator = LatencyEstimator(
+            initial=settings.LLM_INITIAL_LATENCY_ESTIMATE,
+            probe_interval=settings.LLM_LATENCY_PROBE_INTERVAL
         )
+        self.completion_cache = CompletionCache(max_entries=settings.LLM_COMPLETION_CACHE_SIZE)
+        #리플레이 모드: 실제 LLM 대신 캡처된 응답을 사용
+        self.replay_completions = ReplayCompletions(settings.TRAFFIC_REPLAY_PATH) if settings.TRAFFIC_REPLAY_PATH else None
+        #analyze2 ~ analyze6, 채팅 프롬프트에 원문으로 넣는 최근 사용자 메시지 수 (요약은 이보다 오래된 메시지만 다룸)
+        self.recent_window = settings.CONVERSATION_SUMMARY_WINDOW
+        #세션별 누적 대화 요약 (최근 메시지 윈도우 밖의 맥락 보존)
+        self.conversation_summaries = ConversationSummaryStore(
+            summarize=self._summarize_conversation,
+            stringify=self._stringify_message_content,
+            window=self.recent_window,
+            max_chars=settings.CONVERSATION_SUMMARY_MAX_CHARS,
+            max_sessions=settings.CONVERSATION_SUMMARY_MAX_SESSIONS,
+            #리플레이 시에는 요약 시점이 매번 같도록 요청 스레드에서 갱신
+            run_inline=self.replay_completions is not None
+        ) if settings.CONVERSATION_SUMMARY_ENABLED else None
+        #세션별 패턴 분석 (analyze3에서 파악한 패턴을 이후 단계가 재사용)
+        self.pattern_analyses = PatternAnalysisStore(
+            window=self.recent_window,
+            max_sessions=settings.PATTERN_ANALYSIS_MAX_SESSIONS
+        ) if settings.PATTERN_ANALYSIS_ENABLED else None
+
+    def _get_llm(self, profile: GenerationProfile) -> ChatOpenAI:
+        key = profile.client_key()
+        llm = self._llms.get(key)
+        if llm is None:
+            #OpenAI 클라이언트를 직접 만들어 공유 커넥션 풀을 사용하게 함
+            #재시도하면 호출마다 넘기는 timeout(남은 시간)이 여러 번 쓰이므로 자동 재시도는 끔
+            client = openai.OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=self.http_pool.base_url,
+                timeout=profile.timeout,
+                max_retries=0,
+                http_client=self.http_pool.client
+            )
+            llm = ChatOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                model=profile.model,
+                temperature=profile.temperature,
+                max_tokens=profile.max_tokens,
+                request_timeout=profile.timeout,
+                max_retries=0,
+                base_url=self.http_pool.base_url,
+                client=client.chat.completions
+            )
+            self._llms[key] = llm
+        return llm
+
+    def warm_up(self) -> None:
+        """
+        서비스 시작 시 LLM 호스트로 커넥션을 미리 엽니다. (리플레이 모드에서는 생략)
+        """
+        if self.replay_completions is None:
+            self.http_pool.warm_up(settings.LLM_HTTP_WARMUP_CONNECTIONS)
+
+    def close(self) -> None:
+        if self.conversation_summaries is not None:
+            self.conversation_summaries.close()
+        self.http_pool.close()
+
+    def _invoke(self, task: str, messages: List[BaseMessage], local: Optional[Callable[[], str]] = None) -> str:
+        """
+        모든 LLM 호출의 공통 진입점입니다.
+        task에 맞는 생성 프로필로 호출하고, 프로필/지연 시간/입출력 길이를 지표로 남깁니다.
+        호출은 현재 요청 정보(우선순위, session_id, 마감 시간)에 따라 스케줄러를 거쳐 실행됩니다.
+        마감까지 남은 시간이 부족하면 캐시 → 로컬(local) → 기본 응답 순으로 더 빠른 경로를 선택하며,
+        기본 응답이 필요하면 DeadlineExceeded를 던져 각 메서드의 예외 처리로 넘깁니다.
+        리플레이 모드에서는 캡처된 응답을 돌려주고, 캡처 모드에서는 응답을 기록합니다.
+        """
+        context = current_context()
+        key = prompt_key(task, messages)
+        try:
+            return self._invoke_within_budget(task, messages, local, context, key)
+        except DeadlineExceeded as e:
+            #호출하지 않은 LLM 작업량을 예상 지연 시간으로 환산해 기록
+            metrics.inc("deadline_abandoned_calls_total", task=task, reason=e.reason)
+            metrics.inc("deadline_saved_seconds_total", self.latency_estimator.estimate(task), task=task)
+            raise
+
+    def _invoke_within_budget(self, task: str, messages: List[BaseMessage], local: Optional[Callable[[], str]],
+                              context: RequestContext, key: str) -> str:
+        profile = self.profiles.get(task, self.default_profile)
+        labels = {"task": task, "profile": profile.name, "model": profile.model, "priority": context.priority}
+        capturing = self.traffic_capture is not None and self.traffic_capture.enabled
+        
+        #남은 시간이 추정치보다 짧아도 한동안 실제 측정이 없었으면 이번 호출로 지연을 다시 잼 (호출당 한 번만 판단)
+        probing = self._short_of_budget(task, context) and self.latency_estimator.try_probe(task)
+        if probing:
+            metrics.inc("llm_latency_probes_total", task=task)
+        
+        degraded = self._degrade_if_short(task, key, context, local, probing)
+        if degraded is not None:
+            return degraded
+        
+        with self.scheduler.slot(context.priority, context.session_id, context):
+            #대기열에서 기다리는 동안 남은 시간이 줄었을 수 있으므로 다시 확인
+            degraded = self._degrade_if_short(task, key, context, local, probing)
+            if degraded is not None:
+                return degraded
+            
+            timeout = profile.timeout
+            remaining = context.remaining()
+            if remaining is not None:
+                timeout = min(timeout, remaining)
+            
+            started = time.perf_counter()
+            try:
+                if self.replay_completions is not None:
+                    completion = self.replay_completions.get(key)
+                    if completion is None:
+                        raise LookupError(f"캡처에 없는 프롬프트입니다: task={task}, key={key}")
+                else:
+                    completion = self._get_llm(profile).invoke(messages, timeout=timeout).content
+            except Exception as e:
+                metrics.inc("llm_calls_total", outcome="error", **labels)
+                failed_after = time.perf_counter() - started
+                #시간 초과면 실제 지연은 timeout 이상이므로 추정치가 그보다 낮게 남지 않게 함
+                if isinstance(e, openai.APITimeoutError):
+                    failed_after = max(failed_after, timeout)
+                if self.replay_completions is None:
+                    self.latency_estimator.observe_failure(task, failed_after)
+                #요청 쪽 마감/취소로 끊긴 호출은 업스트림 상태와 무관하므로 한도 조정에 쓰지 않음
+                if context.abandon_reason() is None:
+                    self.scheduler.record_call(time.perf_counter() - started, ok=False, key=task)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe("llm_call_latency_seconds", elapsed, **labels)
+            self.scheduler.record_call(elapsed, ok=True, key=task)
+        
+        self.latency_estimator.observe(task, elapsed)
+        self.completion_cache.put(key, completion)
+        metrics.inc("llm_calls_total", outcome="ok", **labels)
+        metrics.inc("llm_prompt_chars_total", sum(len(str(m.content)) for m in messages), **labels)
+        metrics.inc("llm_completion_chars_total", len(completion), **labels)
+        if capturing:
+            self.traffic_capture.record_completion(task, key, completion)
+        return completion
+
+    def _short_of_budget(self, task: str, context: RequestContext) -> bool:
+        remaining = context.remaining()
+        return remaining is not None and remaining < self.latency_estimator.estimate(task)
+
+    def _degrade_if_short(self, task: str, key: str, context: RequestContext,
+                          local: Optional[Callable[[], str]], probing: bool = False) -> Optional[str]:
+        """
+        남은 시간이 충분하거나 이번 호출이 지연 측정용(probing)이면 None을 반환합니다.
+        부족하면 캐시된 응답, 로컬 계산 결과 순으로 반환하고, 둘 다 없으면 DeadlineExceeded를 던집니다.
+        마감이 이미 지났거나 클라이언트가 연결을 끊었으면 바로 포기합니다.
+        """
+        reason = context.abandon_reason()
+        expected = self.latency_estimator.estimate(task)
+        if reason is None:
+            if probing or not self._short_of_budget(task, context):
+                return None
+            reason = "insufficient_budget"
+        
+        if reason != REASON_DISCONNECTED:
+            cached = self.completion_cache.get(key)
+            if cached is not None:
+                metrics.inc("deadline_degraded_total", task=task, path="cached")
+                metrics.inc("deadline_saved_seconds_total", expected, task=task)
+                return cached
+            if local is not None:
+                metrics.inc("deadline_degraded_total", task=task, path="local")
+                metrics.inc("deadline_saved_seconds_total", expected, task=task)
+                return local()
+        
+        metrics.inc("deadline_degraded_total", task=task, path="fallback")
+        raise DeadlineExceeded(reason)
 
     #이 함수 삭제할 수도 있음.    
     def _stringify_message_content(self, content: Any) -> str:
@@ -38,6 +260,154 @@ class ChatbotService:
             return str(content)
         except Exception:
             return str(content)
+
+    def _extract_json(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """
+        LLM 응답에서 첫 '{'부터 마지막 '}'까지를 JSON으로 파싱합니다. 실패하면 None을 반환합니다.
+        """
+        try:
+            #JSON 부분만 추출
+            start_idx = response_text.find('{')
+            end_idx = response_text.rfind('}') + 1
+            if start_idx != -1 and end_idx != -1:
+                json_str = response_text[start_idx:end_idx]
+                return json.loads(json_str)
+        except ValueError:
+            pass
+        return None
+
+    def recent_user_messages(self, conversation_history: List[Dict[str, Any]], limit: int) -> List[str]:
+        """
+        대화 히스토리에서 최근 사용자 메시지 limit개를 시간 순서대로 문자열로 반환합니다.
+        뒤에서부터 필요한 개수만 읽으므로 히스토리가 길어도 비용이 일정합니다.
+        """
+        user_messages: List[str] = []
+        for msg in reversed(conversation_history):
+            if msg.get("role") == "user":
+                content = msg.get("content", "")
+                user_messages.append(self._stringify_message_content(content))
+                if len(user_messages) == limit:
+                    break
+        user_messages.reverse()
+        return user_messages
+
+    def _summarize_conversation(self, session_id: str, previous_summary: str, new_messages: List[str]) -> str:
+        """
+        기존 요약에 새로 윈도우 밖으로 밀려난 사용자 메시지를 더해 요약을 갱신합니다.
+        요청 경로 밖에서 실행되므로 background 우선순위로 호출합니다.
+        """
+        system_prompt = """당신은 상담 기록을 정리하는 보조자입니다.
+        기존 요약과 새 사용자 메시지를 합쳐, 이후 상담에 필요한 맥락만 담은 요약을 작성해주세요.
+        
+        **중요한 규칙:**
+        1. 사용자가 말한 불안의 계기, 반복 행동, 감정, 상황을 중심으로 정리하세요.
+        2. 기존 요약의 중요한 내용은 유지하세요.
+        3. 한글 기준 300자 이내의 평서문으로 작성하세요."""
+        
+        user_prompt = f"기존 요약: {previous_summary or '(없음)'}\n새 사용자 메시지: {' '.join(new_messages)}"
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_prompt)
+        ]
+        with request_scope(RequestContext(session_id=session_id, priority=PRIORITY_BACKGROUND)):
+            return self._invoke("summary", messages)
+
+    def user_turns(self, conversation_history: List[Dict[str, Any]]) -> List[Any]:
+        """
+        대화 히스토리에서 사용자 메시지 원본(content)을 순서대로 꺼냅니다.
+        히스토리 전체를 읽으므로 요청마다 한 번만 호출하고, 결과를 입력 분류, 요약 갱신, 패턴 재사용,
+        프롬프트 작성에 함께 씁니다. (generate_* 메서드는 user_turns 인자로 받음)
+        """
+        return [msg.get("content", "") for msg in conversation_history if msg.get("role") == "user"]
+
+    def recent_messages(self, user_turns: List[Any], limit: int) -> List[str]:
+        """
+        user_turns 중 최근 limit개를 시간 순서대로 문자열로 반환합니다.
+        """
+        return [self._stringify_message_content(content) for content in user_turns[-limit:]]
+
+    def _recent_start(self, conversation_history: List[Dict[str, Any]]) -> int:
+        """
+        최근 사용자 메시지 recent_window개가 시작되는 히스토리 위치를 반환합니다. (요약이 다루지 않는 구간의 시작)
+        """
+        user_turns = 0
+        for index in range(len(conversation_history) - 1, -1, -1):
+            if conversation_history[index].get("role") == "user":
+                user_turns += 1
+                if user_turns == self.recent_window:
+                    return index
+        return 0
+
+    def _with_session_summary(self, user_prompt: str, user_turns: Optional[List[Any]] = None) -> str:
+        """
+        현재 세션의 누적 요약이 있으면 프롬프트 앞에 붙입니다.
+        user_turns가 주어지면 요약을 갱신할 차례인지도 함께 확인합니다.
+        """
+        if self.conversation_summaries is None:
+            return user_prompt
+        session_id = current_context().session_id
+        if user_turns is None:
+            summary = self.conversation_summaries.get(session_id)
+        else:
+            summary = self.conversation_summaries.observe(session_id, user_turns)
+        if not summary:
+            return user_prompt
+        return f"이전 대화 요약: {summary}\n{user_prompt}"
+
+    def _cached_pattern(self, user_turns: List[Any]) -> Optional[Tuple[PatternAnalysis, List[str]]]:
+        """
+        현재 세션에서 재사용할 수 있는 패턴 분석과, 그 뒤에 새로 들어온 사용자 메시지를 반환합니다.
+        """
+        if self.pattern_analyses is None:
+            return None
+        found = self.pattern_analyses.get(current_context().session_id, user_turns)
+        if found is None:
+            return None
+        analysis, new_turns = found
+        return analysis, [self._stringify_message_content(content) for content in new_turns]
+
+    def _store_pattern(self, user_turns: List[Any], analysis: PatternAnalysis) -> None:
+        if self.pattern_analyses is None:
+            return
+        self.pattern_analyses.put(current_context().session_id, user_turns, analysis)
+
+    def _analysis_prompt(self, label: str, user_turns: List[Any],
+                         cached: Optional[Tuple[PatternAnalysis, List[str]]]) -> str:
+        """
+        세션 패턴 분석(cached)이 있으면 원본 대화 대신 구조화된 패턴과 새 메시지만 넣고,
+        없으면 최근 사용자 메시지 recent_window개를 그대로 넣습니다.
+        """
+        if cached is not None:
+            analysis, new_messages = cached
+            user_prompt = analysis.to_prompt(new_messages)
+        else:
+            user_prompt = f"{label}: {' '.join(self.recent_messages(user_turns, self.recent_window))}"
+        return self._with_session_summary(user_prompt, user_turns)
+
+    def fallback_response(self, task: str, user_text: str = "") -> Any:
+        """
+        task별 기본 응답을 반환합니다. 반환 형식은 해당 generate_* 메서드와 같습니다.
+        """
+        if task == "question":
+            subject = user_text.strip() or "말씀해주신 내용"
+            return {
+                "question": f"{subject}에 대해 더 자세히 알아보고 싶습니다.",
+                "choices": list(self.FALLBACK_QUESTION_CHOICES)
+            }
+        if task == "analysis2":
+            return self.FALLBACK_ANALYSIS2
+        if task == "analysis3":
+            return {
+                "user_pattern_summary": self.FALLBACK_PATTERN_SUMMARY,
+                "thought_examples": list(self.FALLBACK_THOUGHT_EXAMPLES)
+            }
+        if task == "analysis4":
+            return self._fallback_category_response("other")
+        if task == "analysis5":
+            return self.FALLBACK_ANALYSIS5
+        if task == "analysis6":
+            return f"{self.FALLBACK_ANALYSIS6_INTRO}\n\n{self.ANALYSIS6_CLOSING}"
+        raise ValueError(f"기본 응답이 없는 task입니다: {task}")
     
     def generate_obsession_question(self, user_text: str) -> Dict[str, Any]:
         """
@@ -79,7 +449,7 @@ class ChatbotService:
             "choices": ["새로운 일을 시작할 때", "작업을 마무리할 때", "타인의 평가를 받을 때"]
         }"""
         
-        user_prompt = f"사용자 텍스트: {user_text}"
+        user_prompt = self._with_session_summary(f"사용자 텍스트: {user_text}")
         
         try:
             messages = [
@@ -87,44 +457,22 @@ class ChatbotService:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
-            response_text = response.content
+            response_text = self._invoke("question", messages)
             
             #JSON 파싱 시도
-            import json
-            try:
-                #JSON 부분만 추출
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_str = response_text[start_idx:end_idx]
-                    result = json.loads(json_str)
-                    return result
-            except:
-                pass
+            result = self._extract_json(response_text)
+            if result is not None:
+                return result
             
             #JSON 파싱 실패 시 기본값
-            return {
-                "question": f"{user_text}에 대해 더 자세히 알아보고 싶습니다.",
-                "choices": [
-                    "스트레스가 있을 때",
-                    "특정 상황에서", 
-                    "불안감이 높을 때"
-                ]
-            }
+            return self.fallback_response("question", user_text)
             
         except Exception as e:
             logger.error(f"LLM 호출 중 오류 발생: {e}")
-            return {
-                "question": f"{user_text}에 대해 더 자세히 알아보고 싶습니다.",
-                "choices": [
-                    "스트레스가 있을 때",
-                    "특정 상황에서", 
-                    "불안감이 높을 때"
-                ]
-            }
+            return self.fallback_response("question", user_text)
     
-    def generate_obsession_analysis2_response(self, conversation_history: List[Dict[str, Any]]) -> str:
+    def generate_obsession_analysis2_response(self, conversation_history: List[Dict[str, Any]],
+                                              user_turns: Optional[List[Any]] = None) -> str:
         """
         대화 히스토리를 분석하여 강박 행동에 대한 공감적 질문을 생성합니다.
         """
@@ -147,16 +495,14 @@ class ChatbotService:
         4. 강박 행동을 부정적으로 표현하지 말고, 중립적으로 표현하세요."""
         
         #대화 히스토리에서 사용자 메시지 추출
-        user_messages = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        user_messages = self.recent_messages(user_turns, self.recent_window)
         
-        #최근 사용자 메시지들을 하나의 텍스트로 결합
-        recent_context = " ".join(user_messages[-3:])  #최근 3개 메시지만 사용
+        #최근 사용자 메시지들을 하나의 텍스트로 결합 (그보다 오래된 메시지는 누적 요약에 포함)
+        recent_context = " ".join(user_messages)
         
-        user_prompt = f"대화 히스토리: {recent_context}"
+        user_prompt = self._with_session_summary(f"대화 히스토리: {recent_context}", user_turns)
         
         try:
             messages = [
@@ -164,14 +510,14 @@ class ChatbotService:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
-            return response.content.strip()
+            return self._invoke("analysis2", messages).strip()
             
         except Exception as e:
             logger.error(f"강박 분석2 응답 생성 중 오류: {e}")
-            return "말씀해주셔서 감사해요.\n혹시 그런 행동을 하면 불편했던 마음이\n좀 나아지나요?"
+            return self.fallback_response("analysis2")
     
-    def generate_obsession_analysis3_response(self, conversation_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_obsession_analysis3_response(self, conversation_history: List[Dict[str, Any]],
+                                              user_turns: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         대화 히스토리를 분석하여 강박 패턴 요약과 생각 예시를 생성합니다.
         """
@@ -181,6 +527,9 @@ class ChatbotService:
         
         **응답 형식 (JSON):**
         {
+            "trigger": "불안이 시작되는 상황이나 생각 (한 문장)",
+            "behaviour": "불안을 줄이기 위해 반복하는 행동 (한 문장)",
+            "category": "contamination" | "checking" | "other",
             "user_pattern_summary": "당신은 [구체적인 강박 패턴]하는 경향이 있는 것 같아요.",
             "thought_examples": [
                 "생각 예시 1",
@@ -196,19 +545,14 @@ class ChatbotService:
            - 확인 강박: "당신은 문을 제대로 잠갔는지, 가스를 끄지 않았는지 걱정이 되어 반복적으로 확인하는 경향이 있는 것 같아요."
            - 완벽주의: "당신은 모든 것을 완벽하게 해야 한다는 압박감을 느끼고, 실수를 방지하기 위해 반복적으로 확인하는 경향이 있는 것 같아요."
         3. thought_examples는 해당 강박과 관련된 구체적인 생각 3개를 생성하세요.
-        4. 생각 예시는 실제로 강박을 경험하는 사람이 가질 법한 현실적인 생각으로 작성하세요."""
-        
-        #대화 히스토리에서 사용자 메시지 추출
-        user_messages = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
+        4. 생각 예시는 실제로 강박을 경험하는 사람이 가질 법한 현실적인 생각으로 작성하세요.
+        5. category는 손 씻기/오염 불안이면 "contamination", 문 잠금/가스 등 반복 확인이면 "checking", 그 외나 애매하면 "other"로 작성하세요."""
         
-        #최근 사용자 메시지들을 하나의 텍스트로 결합
-        recent_context = " ".join(user_messages[-5:])  #최근 5개 메시지 사용
-        
-        user_prompt = f"대화 히스토리: {recent_context}"
+        #세션 패턴 분석이 있으면 구조화된 입력, 없으면 최근 recent_window개 메시지 사용
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        cached = self._cached_pattern(user_turns)
+        user_prompt = self._analysis_prompt("대화 히스토리", user_turns, cached)
         
         try:
             messages = [
@@ -216,47 +560,30 @@ class ChatbotService:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
-            response_text = response.content
+            response_text = self._invoke("analysis3", messages)
             
             #JSON 파싱 시도
-            import json
-            try:
-                #JSON 부분만 추출
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_str = response_text[start_idx:end_idx]
-                    result = json.loads(json_str)
-                    return result
-            except:
-                pass
+            result = self._extract_json(response_text)
+            if result is not None:
+                #이후 단계(analyze4~6)가 재사용할 수 있도록 패턴 저장
+                analysis = PatternAnalysis.from_dict(result)
+                if cached is None and analysis is not None:
+                    self._store_pattern(user_turns, analysis)
+                return result
             
             #JSON 파싱 실패 시 기본값
-            return {
-                "user_pattern_summary": "당신은 불안감을 줄이기 위해 반복적인 행동을 하는 경향이 있는 것 같아요.",
-                "thought_examples": [
-                    "이것을 하지 않으면 나쁜 일이 일어날 것 같아",
-                    "확인하지 않으면 불안해져",
-                    "완벽하지 않으면 실패할 것 같아"
-                ]
-            }
+            return self.fallback_response("analysis3")
             
         except Exception as e:
             logger.error(f"강박 분석3 응답 생성 중 오류: {e}")
-            return {
-                "user_pattern_summary": "당신은 불안감을 줄이기 위해 반복적인 행동을 하는 경향이 있는 것 같아요.",
-                "thought_examples": [
-                    "이것을 하지 않으면 나쁜 일이 일어날 것 같아",
-                    "확인하지 않으면 불안해져",
-                    "완벽하지 않으면 실패할 것 같아"
-                ]
-            }
+            return self.fallback_response("analysis3")
 
-    def categorize_obsession_type(self, conversation_history: List[Dict[str, Any]]) -> str:
+    def categorize_obsession_type(self, conversation_history: List[Dict[str, Any]],
+                                  user_turns: Optional[List[Any]] = None) -> str:
         """
         대화 히스토리를 분석하여 강박 유형을 카테고리화합니다.
         반환값: "contamination" (오염강박), "checking" (확인강박), "other" (그 외 강박)
+        user_turns는 호출한 쪽에서 이미 꺼낸 사용자 메시지 목록입니다. (없으면 히스토리에서 꺼냄)
         """
         system_prompt = """당신은 강박증 전문가입니다. 
         사용자의 대화 히스토리를 분석하여 강박 유형을 분류해주세요.
@@ -289,16 +616,14 @@ class ChatbotService:
         3. 반드시 위 3개 값 중 하나만 반환하세요."""
         
         # 대화 히스토리에서 사용자 메시지 추출
-        user_messages = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        user_messages = self.recent_messages(user_turns, self.recent_window)
         
         # 최근 사용자 메시지들을 하나의 텍스트로 결합
-        recent_context = " ".join(user_messages[-5:])  # 최근 5개 메시지 사용
+        recent_context = " ".join(user_messages)  # 최근 recent_window개 메시지 사용
         
-        user_prompt = f"대화 히스토리: {recent_context}"
+        user_prompt = self._with_session_summary(f"대화 히스토리: {recent_context}", user_turns)
         
         try:
             messages = [
@@ -306,11 +631,12 @@ class ChatbotService:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
-            category = response.content.strip().lower()
+            category = self._invoke(
+                "categorize", messages, local=lambda: self._categorize_locally(recent_context)
+            ).strip().lower()
             
             # 유효한 카테고리인지 확인
-            if category in ["contamination", "checking", "other"]:
+            if category in OBSESSION_TYPES:
                 return category
             else:
                 logger.warning(f"예상치 못한 카테고리 반환: {category}, 기본값 'other' 사용")
@@ -320,31 +646,40 @@ class ChatbotService:
             logger.error(f"강박 카테고리 분류 중 오류: {e}")
             return "other"
 
-    def generate_obsession_analysis4_response(self, conversation_history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _categorize_locally(self, text: str) -> str:
+        """
+        LLM 없이 키워드로 강박 유형을 분류합니다. 마감 시간이 빠듯할 때만 사용합니다.
+        """
+        contamination = sum(text.count(keyword) for keyword in self.CONTAMINATION_KEYWORDS)
+        checking = sum(text.count(keyword) for keyword in self.CHECKING_KEYWORDS)
+        if contamination == checking == 0:
+            return "other"
+        return "contamination" if contamination >= checking else "checking"
+
+    def generate_obsession_analysis4_response(self, conversation_history: List[Dict[str, Any]],
+                                              user_turns: Optional[List[Any]] = None) -> Dict[str, Any]:
         """
         대화 히스토리를 분석하여 강박 유형별 맞춤 응답을 생성합니다.
         """
-        # 1단계: 강박 유형 카테고리화
-        obsession_type = self.categorize_obsession_type(conversation_history)
+        # 1단계: 강박 유형 카테고리화 (analyze3에서 저장한 세션 패턴의 유형이 유효하면 그대로 쓰고, 아니면 분류 모델로 분류)
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        cached = self._cached_pattern(user_turns)
+        if cached is not None and cached[0].category in OBSESSION_TYPES:
+            obsession_type = cached[0].category
+        else:
+            obsession_type = self.categorize_obsession_type(conversation_history, user_turns)
         
         # 2단계: 카테고리별 시나리오에 따른 응답 생성
-        response_data = self._generate_category_specific_response(conversation_history, obsession_type)
+        response_data = self._generate_category_specific_response(user_turns, obsession_type, cached)
         
         return response_data
 
-    def _generate_category_specific_response(self, conversation_history: List[Dict[str, Any]], obsession_type: str) -> Dict[str, Any]:
+    def _generate_category_specific_response(self, user_turns: List[Any], obsession_type: str,
+                                             cached: Optional[Tuple[PatternAnalysis, List[str]]] = None) -> Dict[str, Any]:
         """
         강박 유형에 따른 맞춤 응답을 생성합니다.
         """
-        # 대화 히스토리에서 사용자 메시지 추출
-        user_messages = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
-        
-        recent_context = " ".join(user_messages[-5:])
-        
         if obsession_type == "contamination":
             # 오염강박 시나리오
             system_prompt = """당신은 경험 많은 상담가입니다. 
@@ -420,7 +755,7 @@ class ChatbotService:
             4. 한글 기준 총 길이를 200자 이내로 작성하세요.
             5. '오염 강박', '확인 강박', '강박증', 'OCD' 같은 명칭/진단/유형 라벨은 언급하지 마세요. 행동과 경험만 자연스럽게 묘사하세요."""
         
-        user_prompt = f"대화 히스토리: {recent_context}"
+        user_prompt = self._analysis_prompt("대화 히스토리", user_turns, cached)
         
         try:
             messages = [
@@ -428,8 +763,7 @@ class ChatbotService:
                 HumanMessage(content=user_prompt)
             ]
             
-            response = self.llm.invoke(messages)
-            llm_response = response.content.strip()
+            llm_response = self._invoke("analysis4", messages).strip()
             
             # 카테고리별 고정 메시지 생성
             if obsession_type == "contamination":
@@ -452,29 +786,44 @@ class ChatbotService:
         except Exception as e:
             logger.error(f"카테고리별 응답 생성 중 오류: {e}")
             # 기본값 반환
-            if obsession_type == "contamination":
-                category_message = "지금 당신이 이야기해주신 불편함은, '오염 강박'이라고 불리는 강박증의 한 유형과 비슷한 모습이에요."
-            elif obsession_type == "checking":
-                category_message = "지금 당신이 이야기해주신 불편함은, '확인 강박'이라고 불리는 강박증의 한 유형과 비슷한 모습이에요."
-            else:
-                category_message = "아쉽게도 저희 Mindit 서비스에서는 언급해주신 강박에 도움을 드릴 수 있는 기능이 없어요."
-            
-            return {
-                "user_pattern_summary": "맞아요. 누구나 그런 생각을 할 수 있어요. 하지만 이런 생각이 너무 자주 떠오르거나, 반복되는 행동이 일상생활을 방해한다면 그건 강박적 불안을 다루는 연습이 필요하다는 신호일 수 있어요.",
-                "encouragement": "하지만 걱정하지 마세요. 이를 인식하고, 조금씩 다루는 연습을 해볼 수 있어요. 제가 그 과정을 도와드릴게요 😊" if obsession_type != "other" else "하지만 걱정하지 마세요. 전문기관에 방문하여 상담 받으신다면, 금방 해결해나가실 수 있을 거예요. 사용자분의 여정을 응원합니다.",
-                "category_message": category_message,
-                "obsession_type": obsession_type
-            }
+            return self._fallback_category_response(obsession_type)
+
+    def _fallback_category_response(self, obsession_type: str) -> Dict[str, Any]:
+        """
+        강박 유형별 기본 응답을 반환합니다.
+        """
+        if obsession_type == "contamination":
+            category_message = "지금 당신이 이야기해주신 불편함은, '오염 강박'이라고 불리는 강박증의 한 유형과 비슷한 모습이에요."
+        elif obsession_type == "checking":
+            category_message = "지금 당신이 이야기해주신 불편함은, '확인 강박'이라고 불리는 강박증의 한 유형과 비슷한 모습이에요."
+        else:
+            category_message = "아쉽게도 저희 Mindit 서비스에서는 언급해주신 강박에 도움을 드릴 수 있는 기능이 없어요."
+        
+        return {
+            "user_pattern_summary": "맞아요. 누구나 그런 생각을 할 수 있어요. 하지만 이런 생각이 너무 자주 떠오르거나, 반복되는 행동이 일상생활을 방해한다면 그건 강박적 불안을 다루는 연습이 필요하다는 신호일 수 있어요.",
+            "encouragement": "하지만 걱정하지 마세요. 이를 인식하고, 조금씩 다루는 연습을 해볼 수 있어요. 제가 그 과정을 도와드릴게요 😊" if obsession_type != "other" else "하지만 걱정하지 마세요. 전문기관에 방문하여 상담 받으신다면, 금방 해결해나가실 수 있을 거예요. 사용자분의 여정을 응원합니다.",
+            "category_message": category_message,
+            "obsession_type": obsession_type
+        }
 
     def generate_chat_response(self, message: str, conversation_history: List[Dict] = None) -> str:
         """
         일반적인 채팅 응답을 생성합니다.
         """
         messages = [SystemMessage(content=self.COMMON_SYSTEM_PROMPT)]
+        conversation_history = conversation_history or []
         
-        #대화 히스토리가 있다면 추가
+        #누적 대화 요약이 있다면 추가 (최근 사용자 메시지 recent_window개보다 오래된 메시지를 담음)
+        if self.conversation_summaries is not None:
+            summary = self.conversation_summaries.observe(
+                current_context().session_id, self.user_turns(conversation_history)
+            )
+            if summary:
+                messages.append(SystemMessage(content=f"이전 대화 요약: {summary}"))
+        
+        #대화 히스토리가 있다면 최근 사용자 메시지 recent_window개와 그 사이의 응답을 추가
         if conversation_history:
-            for hist in conversation_history[-5:]:  #최근 5개 메시지만 사용
+            for hist in conversation_history[self._recent_start(conversation_history):]:
                 if hist.get("role") == "user":
                     messages.append(HumanMessage(content=hist.get("content", "")))
                 elif hist.get("role") == "assistant":
@@ -483,13 +832,13 @@ class ChatbotService:
         messages.append(HumanMessage(content=message))
         
         try:
-            response = self.llm.invoke(messages)
-            return response.content
+            return self._invoke("chat", messages)
         except Exception as e:
             logger.error(f"채팅 응답 생성 중 오류: {e}")
             return "죄송합니다. 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주세요."
 
-    def generate_obsession_analysis5_response(self, conversation_history: List[Dict[str, Any]]) -> str:
+    def generate_obsession_analysis5_response(self, conversation_history: List[Dict[str, Any]],
+                                              user_turns: Optional[List[Any]] = None) -> str:
         """
         대화 히스토리를 바탕으로 사용자가 스스로 패턴을 자각하도록 돕는
         공감적 반추 질문을 한국어로 생성합니다.
@@ -507,34 +856,24 @@ class ChatbotService:
         하고 조금 더 자각이 생긴 부분이 있을까요?"
         """
 
-        # 사용자 메시지 최근 문맥 추출
-        user_messages: List[str] = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
-
-        recent_context = " ".join(user_messages[-5:])
-        user_prompt = f"최근 사용자 맥락: {recent_context}"
+        # 세션 패턴 분석 또는 최근 사용자 문맥
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        user_prompt = self._analysis_prompt("최근 사용자 맥락", user_turns, self._cached_pattern(user_turns))
 
         try:
             messages = [
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_prompt)
             ]
-            response = self.llm.invoke(messages)
-            text = response.content.strip()
+            text = self._invoke("analysis5", messages).strip()
             return text
         except Exception as e:
             logger.error(f"강박 분석5 응답 생성 중 오류: {e}")
-            fallback = (
-                "혹시, 방금 나눈 대화를 돌아보면 특정 상황에서 불안이 올라오고, "
-                "그 불안을 달래기 위해 어떤 행동을 반복하게 되는 흐름이 보일까요? "
-                "조금 더 자각이 생긴 부분이 있을까요?"
-            )
-            return fallback
+            return self.fallback_response("analysis5")
 
-    def generate_obsession_analysis6_response(self, conversation_history: List[Dict[str, Any]]) -> str:
+    def generate_obsession_analysis6_response(self, conversation_history: List[Dict[str, Any]],
+                                              user_turns: Optional[List[Any]] = None) -> str:
         """
         사용자의 최근 대화를 바탕으로 '알아가는 것이 중요하다, 함께 연습할 수 있다'는
         메시지를 LLM으로 자연스럽게 생성하고, 고정 문장을 후행으로 붙여 반환합니다.
@@ -548,33 +887,21 @@ class ChatbotService:
             "예시:그 인식이 정말 중요해요 👏 이제 우리가 함께 그 불안을 조금씩 줄이는 연습을 시작해볼 수 있어요. " 
         )
 
-        # 최근 사용자 맥락 생성
-        user_messages: List[str] = []
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                content = msg.get("content", "")
-                user_messages.append(self._stringify_message_content(content))
+        # 세션 패턴 분석 또는 최근 사용자 맥락
+        if user_turns is None:
+            user_turns = self.user_turns(conversation_history)
+        user_prompt = self._analysis_prompt("최근 사용자 맥락", user_turns, self._cached_pattern(user_turns))
 
-        recent_context = " ".join(user_messages[-5:])
-        user_prompt = f"최근 사용자 맥락: {recent_context}"
-
-        closing_fixed = (
-            "먼저, 어떤 상황이 특히 불안했는지 정리하며 시작해볼까요?"
-        )
+        closing_fixed = self.ANALYSIS6_CLOSING
 
         try:
             messages = [
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=user_prompt),
             ]
-            response = self.llm.invoke(messages)
-            intro = response.content.strip()
+            intro = self._invoke("analysis6", messages).strip()
 
             return f"{intro}\n\n{closing_fixed}"
         except Exception as e:
             logger.error(f"강박 분석6 응답 생성 중 오류: {e}")
-            fallback_intro = (
-                "지금 느끼는 불안을 알아차리고 말해주는 것 자체가 큰 시작이에요. "
-                "우리는 그 과정을 함께 천천히 연습해볼 수 있어요."
-            )
-            return f"{fallback_intro}\n\n{closing_fixed}"
\ No newline at end of file
+            return self.fallback_response("analysis6")
\ No newline at end of file
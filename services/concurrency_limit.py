@@ -0,0 +1,113 @@
+import math
+from typing import Dict, Optional
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class FixedLimit:
+    """
+    항상 같은 동시 실행 한도를 유지합니다. (적응형 제한을 끌 때 사용)
+    """
+    name = "fixed"
+
+    def __init__(self, limit: int):
+        self.limit = float(limit)
+
+    @property
+    def current(self) -> int:
+        return max(1, int(self.limit))
+
+    def update(self, latency: float, in_flight: int, ok: bool, key: str = "") -> None:
+        pass
+
+
+class AIMDLimit(FixedLimit):
+    """
+    AIMD(Additive Increase / Multiplicative Decrease) 방식의 동시 실행 한도입니다.
+
+    - 호출이 실패하거나 latency_threshold보다 오래 걸리면 한도에 backoff를 곱합니다.
+    - 성공하면 한도가 실제로 쓰이고 있을 때(in_flight >= limit/2)만 1/limit씩 늘립니다.
+      (한도만큼 호출이 끝날 때마다 약 1 증가)
+    """
+    name = "aimd"
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 latency_threshold: float = 10.0, backoff: float = 0.9):
+        super().__init__(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff = backoff
+
+    def update(self, latency: float, in_flight: int, ok: bool, key: str = "") -> None:
+        if not ok or latency > self.latency_threshold:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class GradientLimit(FixedLimit):
+    """
+    지연 시간 기울기(gradient)로 동시 실행 한도를 조정합니다. (Netflix concurrency-limits의 Gradient와 같은 방식)
+
+    task마다 프롬프트 길이와 max_tokens가 달라 지연 시간의 기준이 다르므로 task(key)별로 아래 두 값을 유지합니다.
+      - baseline: 부하가 없을 때의 지연 (최근 지연의 최솟값, 업스트림이 영구히 느려진 경우를 위해 조금씩 올라감)
+      - recent: 최근 지연의 지수 이동 평균 (LLM 응답 길이에 따른 편차를 줄이기 위해)
+      gradient = clamp(tolerance * baseline / recent, 0.5, 1.0)
+      새 한도 = limit * gradient + sqrt(limit)
+    업스트림이 밀려 지연이 늘면 gradient < 1 이 되어 한도가 줄고,
+    지연이 기준 수준이면 sqrt(limit)만큼의 여유를 두고 한도를 늘려 최대 처리량 지점을 찾아갑니다.
+    """
+    name = "gradient"
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, tolerance: float = 1.2,
+                 smoothing: float = 0.2, recent_alpha: float = 0.2, baseline_drift: float = 0.002,
+                 backoff: float = 0.9):
+        super().__init__(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.recent_alpha = recent_alpha
+        self.baseline_drift = baseline_drift
+        self.backoff = backoff
+        self._recent: Dict[str, float] = {}
+        self._baseline: Dict[str, float] = {}
+
+    def update(self, latency: float, in_flight: int, ok: bool, key: str = "") -> None:
+        if not ok:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return
+        latency = max(latency, 1e-6)
+        recent = self._recent.get(key, latency)
+        recent += self.recent_alpha * (latency - recent)
+        baseline = min(recent, self._baseline.get(key, recent) * (1 + self.baseline_drift))
+        self._recent[key] = recent
+        self._baseline[key] = baseline
+
+        gradient = max(0.5, min(1.0, self.tolerance * baseline / recent))
+        new_limit = self.limit * gradient + math.sqrt(self.limit)
+        if new_limit > self.limit and in_flight * 2 < self.limit:
+            #한도를 다 쓰지도 않는 상황에서는 늘리지 않음
+            return
+        new_limit = self.limit * (1 - self.smoothing) + new_limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, new_limit))
+
+
+def limit_from_settings(algorithm: Optional[str] = None) -> FixedLimit:
+    """
+    LLM_CONCURRENCY_LIMITER 설정(gradient / aimd / fixed)에 맞는 동시 실행 한도 알고리즘을 만듭니다.
+    fixed는 LLM_MAX_CONCURRENCY를 그대로 쓰고, 나머지는 LLM_MIN_CONCURRENCY ~ LLM_MAX_CONCURRENCY 사이에서 조정합니다.
+    """
+    algorithm = (algorithm or settings.LLM_CONCURRENCY_LIMITER).lower()
+    initial = min(settings.LLM_INITIAL_CONCURRENCY, settings.LLM_MAX_CONCURRENCY)
+    if algorithm == "gradient":
+        return GradientLimit(initial, settings.LLM_MIN_CONCURRENCY, settings.LLM_MAX_CONCURRENCY)
+    if algorithm == "aimd":
+        return AIMDLimit(initial, settings.LLM_MIN_CONCURRENCY, settings.LLM_MAX_CONCURRENCY,
+                         latency_threshold=settings.LLM_AIMD_LATENCY_THRESHOLD)
+    if algorithm != "fixed":
+        logger.error(f"알 수 없는 LLM_CONCURRENCY_LIMITER: {algorithm}, 고정 한도 사용")
+    return FixedLimit(settings.LLM_MAX_CONCURRENCY)
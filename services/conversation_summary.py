@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+from core.logging import get_logger
+from core.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SessionSummary:
+    text: str = ""
+    #요약에 반영된 사용자 메시지 수 (히스토리 앞에서부터)
+    summarized_turns: int = 0
+    pending: bool = False
+
+
+class ConversationSummaryStore:
+    """
+    세션별 누적 대화 요약을 관리합니다.
+
+    프롬프트에는 최근 window개의 사용자 메시지만 원문으로 들어가므로,
+    그보다 오래된 메시지가 새로 생기면 기존 요약 + 새 메시지로 요약을 갱신합니다.
+    갱신은 백그라운드 스레드에서 실행되고, 요청은 그 시점의 요약을 그대로 사용합니다.
+    """
+
+    def __init__(self, summarize: Callable[[Optional[str], str, List[str]], str],
+                 stringify: Callable[[Any], str], window: int = 3, max_chars: int = 500,
+                 max_sessions: int = 10000, run_inline: bool = False):
+        self._summarize = summarize
+        self._stringify = stringify
+        self.window = window
+        self.max_chars = max_chars
+        self.max_sessions = max_sessions
+        #리플레이처럼 결정적인 실행이 필요할 때는 요청 스레드에서 바로 갱신
+        self.run_inline = run_inline
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, SessionSummary]" = OrderedDict()
+        self._executor = None if run_inline else ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-summary")
+
+    def get(self, session_id: Optional[str]) -> str:
+        if not session_id:
+            return ""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            return state.text if state else ""
+
+    def observe(self, session_id: Optional[str], user_turns: List[Any]) -> str:
+        """
+        현재 요청의 사용자 메시지 원본(content) 목록을 보고, 필요하면 요약 갱신을 예약합니다.
+        반환값은 이번 요청에 사용할 요약입니다. (갱신 결과는 다음 요청부터 반영)
+        """
+        if not session_id:
+            return ""
+        overflow_end = len(user_turns) - self.window
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = SessionSummary()
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            if len(user_turns) < state.summarized_turns:
+                #히스토리가 짧아졌으면 새 대화로 보고 초기화
+                state.text, state.summarized_turns = "", 0
+            current = state.text
+            if overflow_end <= state.summarized_turns or state.pending:
+                return current
+            state.pending = True
+            previous, start = state.text, state.summarized_turns
+
+        #문자열 변환은 요약에 새로 들어갈 메시지만
+        new_messages = [self._stringify(content) for content in user_turns[start:overflow_end]]
+        if self._executor is None:
+            self._update(session_id, previous, new_messages, overflow_end)
+        else:
+            self._executor.submit(self._update, session_id, previous, new_messages, overflow_end)
+            metrics.inc("conversation_summary_scheduled_total")
+        return current
+
+    def _update(self, session_id: str, previous: str, new_messages: List[str], summarized_turns: int) -> None:
+        started = time.perf_counter()
+        try:
+            text = self._summarize(session_id, previous, new_messages).strip()[:self.max_chars]
+            outcome = "ok"
+        except Exception as e:
+            logger.error(f"대화 요약 갱신 중 오류: {e}")
+            text, outcome = None, "error"
+        metrics.observe("conversation_summary_update_seconds", time.perf_counter() - started, outcome=outcome)
+        metrics.inc("conversation_summary_updates_total", outcome=outcome)
+        metrics.inc("conversation_summary_messages_total", len(new_messages))
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                return
+            state.pending = False
+            if text is not None:
+                state.text = text
+                state.summarized_turns = summarized_turns
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class LatencyEstimator:
+    """
+    task별 LLM 호출 지연 시간을 지수 이동 평균(EWMA)으로 추정합니다.
+    남은 시간이 이 추정치보다 짧으면 전체 생성 대신 더 빠른 경로를 선택합니다.
+
+    - 성공한 호출은 걸린 시간을 그대로 반영합니다. (observe)
+    - 시간 초과나 오류로 끝난 호출은 실제 지연이 그 이상이라는 뜻이므로 추정치를 낮추지 않고,
+      필요하면 그 시간까지 올립니다. (observe_failure)
+    - 추정치 때문에 건너뛰기만 하면 업스트림이 빨라져도 알 수 없으므로,
+      probe_interval초 동안 실제 측정이 없었던 task는 짧은 마감의 요청도 한 번 호출하게 합니다. (try_probe)
+    """
+
+    def __init__(self, initial: float = 2.0, alpha: float = 0.2, probe_interval: float = 5.0):
+        self.initial = initial
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._estimates: Dict[str, float] = {}
+        #task별 마지막 실제 호출 시각 (time.monotonic())
+        self._measured_at: Dict[str, float] = {}
+
+    def estimate(self, task: str) -> float:
+        with self._lock:
+            return self._estimates.get(task, self.initial)
+
+    def observe(self, task: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._estimates.get(task)
+            if previous is None:
+                self._estimates[task] = seconds
+            else:
+                self._estimates[task] = previous + self.alpha * (seconds - previous)
+            self._measured_at[task] = time.monotonic()
+
+    def observe_failure(self, task: str, seconds: float) -> None:
+        """
+        seconds 만에 실패한 호출을 반영합니다. seconds는 실제 지연의 하한입니다.
+        """
+        with self._lock:
+            self._estimates[task] = max(self._estimates.get(task, self.initial), seconds)
+            self._measured_at[task] = time.monotonic()
+
+    def try_probe(self, task: str) -> bool:
+        """
+        남은 시간이 추정치보다 짧은 요청이 그래도 호출해 볼 차례인지 확인합니다.
+        task마다 probe_interval초에 한 번만 True를 반환합니다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            measured_at = self._measured_at.get(task)
+            if measured_at is not None and now - measured_at < self.probe_interval:
+                return False
+            self._measured_at[task] = now
+            return True
+
+
+class CompletionCache:
+    """
+    프롬프트 키별 최근 LLM 응답을 보관하는 LRU 캐시입니다.
+    시간이 부족할 때 같은 프롬프트의 이전 응답을 재사용하는 용도입니다.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            completion = self._entries.get(key)
+            if completion is not None:
+                self._entries.move_to_end(key)
+            return completion
+
+    def put(self, key: str, completion: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = completion
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
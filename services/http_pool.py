@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+import httpx
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+def http2_available() -> bool:
+    """
+    HTTP/2는 h2 패키지가 있을 때만 사용할 수 있습니다.
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMHttpPool:
+    """
+    외부 LLM 호출이 공유하는 keep-alive HTTP 커넥션 풀입니다.
+    httpcore trace 이벤트로 새 커넥션/TLS 핸드셰이크/요청 수를 세어 커넥션 재사용률을 지표로 남깁니다.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 120.0, connect_timeout: float = 5.0, http2: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2 and http2_available()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = 0
+        self._tls_handshakes = 0
+        self.client = httpx.Client(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            #요청별 타임아웃은 생성 프로필의 timeout이 우선 적용됨
+            timeout=httpx.Timeout(60.0, connect=connect_timeout),
+            event_hooks={"request": [self._attach_trace]}
+        )
+        metrics.set_gauge("llm_http_pool_max_connections", max_connections)
+        metrics.set_gauge("llm_http_pool_http2", 1 if self.http2 else 0)
+
+    @classmethod
+    def from_settings(cls) -> "LLMHttpPool":
+        return cls(
+            base_url=settings.OPENAI_BASE_URL,
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.LLM_HTTP_CONNECT_TIMEOUT,
+            http2=settings.LLM_HTTP2
+        )
+
+    def _attach_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._connections += 1
+            metrics.inc("llm_http_connections_opened_total")
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self._tls_handshakes += 1
+            metrics.inc("llm_http_tls_handshakes_total")
+        elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+            with self._lock:
+                self._requests += 1
+                reuse_ratio = 1 - self._connections / self._requests
+            metrics.inc("llm_http_requests_total")
+            metrics.set_gauge("llm_http_connection_reuse_ratio", round(max(reuse_ratio, 0.0), 4))
+
+    def warm_up(self, connections: int = 1) -> int:
+        """
+        서비스 시작 시 LLM 호스트로 커넥션을 미리 열어 첫 요청의 TCP/TLS 비용을 없앱니다.
+        동시에 요청을 보내야 커넥션이 여러 개 열리며, HTTP/2는 커넥션 하나로 다중화하므로 1개만 엽니다.
+        반환값은 성공한 워밍업 요청 수입니다.
+        """
+        if self.http2:
+            connections = 1
+        if connections <= 0:
+            return 0
+
+        def _ping(_):
+            try:
+                #응답 코드와 무관하게 커넥션은 풀에 남음
+                self.client.head(self.base_url)
+                return True
+            except httpx.HTTPError as e:
+                logger.warning(f"LLM 커넥션 워밍업 실패: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            succeeded = sum(executor.map(_ping, range(connections)))
+        metrics.inc("llm_http_warmup_requests_total", succeeded)
+        logger.info(f"LLM 커넥션 워밍업 완료: {succeeded}/{connections} (http2={self.http2})")
+        return succeeded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, connections, handshakes = self._requests, self._connections, self._tls_handshakes
+        return {
+            "requests": requests,
+            "connections_opened": connections,
+            "tls_handshakes": handshakes,
+            "reused_requests": max(requests - connections, 0),
+            "http2": self.http2,
+        }
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,77 @@
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional
+from core.metrics import metrics
+
+#판정 결과
+DECISION_FULL = "full"
+DECISION_FALLBACK = "fallback"
+
+
+@dataclass(frozen=True)
+class TriageDecision:
+    decision: str
+    reason: str
+
+    @property
+    def needs_llm(self) -> bool:
+        return self.decision == DECISION_FULL
+
+
+def _degenerate_reason(text: str) -> Optional[str]:
+    """
+    LLM에 보내도 기본 응답과 다를 바 없는 입력이면 그 이유를, 아니면 None을 반환합니다.
+    """
+    if not text:
+        return "empty"
+    stripped = text.strip()
+    if not stripped:
+        return "whitespace"
+    #글자(L*)나 숫자(N*)가 하나도 없으면 이모지/기호만 있는 입력
+    meaningful = sum(1 for ch in stripped if unicodedata.category(ch)[0] in ("L", "N"))
+    if meaningful == 0:
+        return "no_text"
+    if meaningful == 1:
+        return "single_char"
+    return None
+
+
+def _is_duplicate(user_messages: List[str]) -> bool:
+    """
+    마지막 사용자 메시지가 바로 앞 사용자 메시지를 그대로 반복했는지 확인합니다.
+    """
+    if len(user_messages) < 2:
+        return False
+    return user_messages[-1].strip() == user_messages[-2].strip()
+
+
+class InputTriage:
+    """
+    ChatbotService 앞단에서 LLM 호출 없이 처리할 수 있는 입력을 걸러냅니다.
+
+    - 빈 입력, 공백, 이모지/기호만 있는 입력, 한 글자 입력 -> 기본 응답
+    - 히스토리의 마지막 사용자 메시지가 바로 앞 사용자 메시지와 같은 경우(중복 전송) -> 기본 응답
+      (같은 요청을 다시 보낸 재시도는 중복이 아니므로 전체 파이프라인으로 처리)
+    - 그 외 -> 전체 파이프라인(LLM)
+
+    모든 판정은 triage_decisions_total 지표로 집계됩니다.
+    """
+
+    def triage_text(self, endpoint: str, user_text: str) -> TriageDecision:
+        return self._decide(endpoint, user_text or "")
+
+    def triage_messages(self, endpoint: str, user_messages: List[str], detect_duplicates: bool = True) -> TriageDecision:
+        """
+        엔드포인트가 실제로 LLM에 보내는 최근 사용자 메시지들을 기준으로 판정합니다.
+        기본 응답이 결과를 바꾸는 엔드포인트(예: 유형 분류)는 detect_duplicates=False로 중복 판정을 끕니다.
+        """
+        duplicate = detect_duplicates and _is_duplicate(user_messages)
+        return self._decide(endpoint, "\n".join(user_messages), duplicate)
+
+    def _decide(self, endpoint: str, text: str, duplicate: bool = False) -> TriageDecision:
+        reason = _degenerate_reason(text)
+        if reason is None and duplicate:
+            reason = "duplicate"
+        decision = TriageDecision(DECISION_FALLBACK, reason) if reason else TriageDecision(DECISION_FULL, "ok")
+        metrics.inc("triage_decisions_total", endpoint=endpoint, decision=decision.decision, reason=decision.reason)
+        return decision
@@ -0,0 +1,81 @@
+import json
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    LLM 호출 한 건에 적용할 생성 설정입니다.
+    name은 지표에 남는 프로필 이름이고, 나머지 값이 같으면 같은 LLM 클라이언트를 공유합니다.
+    """
+    name: str
+    model: str
+    temperature: float
+    max_tokens: Optional[int]
+    timeout: float
+
+    def client_key(self):
+        return (self.model, self.temperature, self.max_tokens, self.timeout)
+
+
+def default_profiles() -> Dict[str, GenerationProfile]:
+    """
+    ChatbotService 메서드(task)별 기본 생성 프로필을 반환합니다.
+    max_tokens는 각 프롬프트의 분량 규칙보다 넉넉하게 잡아 정상 응답이 잘리지 않도록 합니다.
+    (한글은 대략 글자당 1~1.5 토큰)
+    """
+    main = settings.OPENAI_MODEL
+    fast = settings.OPENAI_FAST_MODEL
+    return {
+        #JSON 질문 + 선택지 3개
+        "question": GenerationProfile("structured", main, 0.7, 400, 30.0),
+        #2~3줄 고정 형식 질문
+        "analysis2": GenerationProfile("short_reply", main, 0.7, 300, 30.0),
+        #JSON 패턴 분석(계기/행동/유형/요약) + 생각 예시 3개
+        #여기서 정한 유형을 analysis4가 그대로 재사용하므로 분류가 흔들리지 않게 temperature를 낮춤
+        "analysis3": GenerationProfile("pattern", main, 0.2, 800, 30.0),
+        #"contamination" / "checking" / "other" 한 단어 분류
+        "categorize": GenerationProfile("classifier", fast, 0.0, 5, 10.0),
+        #200자 이내
+        "analysis4": GenerationProfile("capped_200", main, 0.7, 300, 30.0),
+        #예시(4줄, 90자 안팎) 분량의 질문, API 문서상 상한은 280자
+        "analysis5": GenerationProfile("short_question", main, 0.7, 400, 30.0),
+        #한두 문장 도입부 (고정 마무리 문장은 코드에서 붙임)
+        "analysis6": GenerationProfile("short_intro", main, 0.7, 200, 30.0),
+        #세션 누적 대화 요약 (요청 경로 밖에서 실행)
+        "summary": GenerationProfile("summary", fast, 0.3, 500, 30.0),
+        #일반 채팅은 분량 제한 없음
+        "chat": GenerationProfile("chat", main, 0.7, None, 60.0),
+    }
+
+
+def apply_overrides(profiles: Dict[str, GenerationProfile], overrides: Dict[str, Dict[str, Any]]) -> Dict[str, GenerationProfile]:
+    """
+    task별로 일부 필드만 덮어씁니다.
+    예: {"categorize": {"model": "gpt-4o-mini"}, "analysis5": {"max_tokens": 600}}
+    """
+    result = dict(profiles)
+    for task, fields in overrides.items():
+        base = result.get(task, result["chat"])
+        result[task] = replace(base, **fields)
+    return result
+
+
+def load_profiles(overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, GenerationProfile]:
+    """
+    기본 프로필에 LLM_PROFILE_OVERRIDES(JSON) 환경변수와 인자로 받은 설정을 차례로 적용합니다.
+    """
+    profiles = default_profiles()
+    if settings.LLM_PROFILE_OVERRIDES:
+        try:
+            profiles = apply_overrides(profiles, json.loads(settings.LLM_PROFILE_OVERRIDES))
+        except (ValueError, TypeError) as e:
+            logger.error(f"LLM_PROFILE_OVERRIDES 파싱 실패, 기본 프로필 사용: {e}")
+    if overrides:
+        profiles = apply_overrides(profiles, overrides)
+    return profiles
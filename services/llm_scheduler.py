@@ -0,0 +1,179 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+from core.config import settings
+from core.metrics import metrics
+from services.concurrency_limit import FixedLimit, limit_from_settings
+from services.request_context import PRIORITIES, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, DeadlineExceeded, RequestContext
+
+#대기 중 마감/취소 여부를 확인하는 주기(초)
+_ABANDON_CHECK_INTERVAL = 0.05
+
+
+class _Ticket:
+    __slots__ = ("priority", "session_id", "granted")
+
+    def __init__(self, priority: str, session_id: str):
+        self.priority = priority
+        self.session_id = session_id
+        self.granted = False
+
+
+class LLMScheduler:
+    """
+    모든 LLM 호출이 거쳐 가는 우선순위 스케줄러입니다.
+
+    - 우선순위: interactive 대기열이 먼저 처리되고, background는 남는 자리만 사용합니다.
+    - 전체 동시 실행 한도는 limit 알고리즘이 호출 결과(record_call)를 보고 조정합니다.
+    - 클래스별 동시 실행 한도: 전체 한도 * share (최소 1)
+    - 같은 클래스 안에서는 session_id 단위로 돌아가며(round-robin) 처리해
+      한 세션의 대량 호출이 다른 세션을 밀어내지 않게 합니다.
+    """
+
+    def __init__(self, max_concurrency: int, shares: Optional[Dict[str, float]] = None,
+                 limit: Optional[FixedLimit] = None):
+        self.limit = limit or FixedLimit(max_concurrency)
+        self.shares = shares or {PRIORITY_INTERACTIVE: 1.0}
+        self._cond = threading.Condition()
+        #클래스별 대기열: session_id -> 해당 세션의 대기 티켓(FIFO)
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._queued: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._in_flight: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._anonymous = 0
+        metrics.set_gauge("llm_concurrency_limit", self.limit.current, algorithm=self.limit.name)
+
+    @classmethod
+    def from_settings(cls) -> "LLMScheduler":
+        return cls(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            shares={
+                PRIORITY_INTERACTIVE: settings.LLM_INTERACTIVE_SHARE,
+                PRIORITY_BACKGROUND: settings.LLM_BACKGROUND_SHARE,
+            },
+            limit=limit_from_settings()
+        )
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.limit.current
+
+    def class_limit(self, priority: str) -> int:
+        share = self.shares.get(priority, 1.0)
+        return max(1, math.ceil(self.max_concurrency * share))
+
+    @contextmanager
+    def slot(self, priority: str, session_id: Optional[str] = None,
+             context: Optional[RequestContext] = None) -> Iterator[float]:
+        """
+        실행 자리를 얻을 때까지 대기한 뒤 블록을 실행합니다. 대기 시간(초)을 돌려줍니다.
+        context가 주어지면 대기 중 마감이 지나거나 요청이 취소될 때 대기열에서 빠지고 DeadlineExceeded를 던집니다.
+        """
+        if priority not in self._queues:
+            priority = PRIORITY_INTERACTIVE
+        started = time.perf_counter()
+        try:
+            self._acquire(priority, session_id, context)
+        finally:
+            waited = time.perf_counter() - started
+            metrics.observe("llm_queue_wait_seconds", waited, priority=priority)
+        try:
+            yield waited
+        finally:
+            self._release(priority)
+
+    def _acquire(self, priority: str, session_id: Optional[str], context: Optional[RequestContext]) -> None:
+        with self._cond:
+            if not session_id:
+                #세션이 없는 호출은 각각 별도 흐름으로 취급
+                self._anonymous += 1
+                session_id = f"anonymous-{self._anonymous}"
+            ticket = _Ticket(priority, session_id)
+            self._queues[priority].setdefault(session_id, deque()).append(ticket)
+            self._queued[priority] += 1
+            self._dispatch()
+            while not ticket.granted:
+                reason = context.abandon_reason() if context is not None else None
+                if reason is not None:
+                    self._remove(ticket)
+                    metrics.inc("llm_queue_abandoned_total", priority=priority, reason=reason)
+                    raise DeadlineExceeded(reason)
+                self._cond.wait(_ABANDON_CHECK_INTERVAL if context is not None else None)
+
+    def _remove(self, ticket: _Ticket) -> None:
+        """
+        허가받지 못한 티켓을 대기열에서 뺍니다. (self._cond 보유 상태에서 호출)
+        """
+        sessions = self._queues[ticket.priority]
+        tickets = sessions.get(ticket.session_id)
+        if tickets is None or ticket not in tickets:
+            return
+        tickets.remove(ticket)
+        if not tickets:
+            del sessions[ticket.session_id]
+        self._queued[ticket.priority] -= 1
+        metrics.set_gauge("llm_queue_depth", self._queued[ticket.priority], priority=ticket.priority)
+
+    def record_call(self, latency: float, ok: bool, key: str = "") -> None:
+        """
+        slot 안에서 끝난 LLM 호출 결과를 한도 알고리즘에 알립니다.
+        캐시 응답처럼 LLM을 호출하지 않은 경우나 요청 쪽 마감으로 끊긴 호출은 알리지 않습니다.
+        """
+        with self._cond:
+            before = self.limit.current
+            self.limit.update(latency, sum(self._in_flight.values()), ok, key)
+            metrics.set_gauge("llm_concurrency_limit", self.limit.current, algorithm=self.limit.name)
+            if self.limit.current > before:
+                self._dispatch()
+
+    def _release(self, priority: str) -> None:
+        with self._cond:
+            self._in_flight[priority] -= 1
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """
+        빈 자리가 있는 동안 우선순위 순서대로 대기 티켓을 허가합니다. (self._cond 보유 상태에서 호출)
+        """
+        granted = False
+        while sum(self._in_flight.values()) < self.max_concurrency:
+            ticket = None
+            for priority in PRIORITIES:
+                if self._queued[priority] and self._in_flight[priority] < self.class_limit(priority):
+                    ticket = self._pop_round_robin(priority)
+                    break
+            if ticket is None:
+                break
+            ticket.granted = True
+            self._in_flight[ticket.priority] += 1
+            granted = True
+        for priority in PRIORITIES:
+            metrics.set_gauge("llm_queue_depth", self._queued[priority], priority=priority)
+            metrics.set_gauge("llm_in_flight", self._in_flight[priority], priority=priority)
+        if granted:
+            self._cond.notify_all()
+
+    def _pop_round_robin(self, priority: str) -> _Ticket:
+        sessions = self._queues[priority]
+        session_id, tickets = next(iter(sessions.items()))
+        ticket = tickets.popleft()
+        if tickets:
+            #다음 차례는 다른 세션에게
+            sessions.move_to_end(session_id)
+        else:
+            del sessions[session_id]
+        self._queued[priority] -= 1
+        return ticket
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {
+                priority: {
+                    "queued": self._queued[priority],
+                    "in_flight": self._in_flight[priority],
+                    "limit": self.class_limit(priority),
+                }
+                for priority in PRIORITIES
+            }
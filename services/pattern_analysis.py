@@ -0,0 +1,116 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+from core.metrics import metrics
+
+OBSESSION_TYPES = ("contamination", "checking", "other")
+
+
+@dataclass(frozen=True)
+class PatternAnalysis:
+    """
+    한 세션에서 파악한 사용자의 강박 패턴입니다.
+    category는 categorize_obsession_type과 같은 값("contamination" / "checking" / "other")을 씁니다.
+    """
+    trigger: str
+    behaviour: str
+    category: str
+    summary: str
+
+    @classmethod
+    def from_dict(cls, data: Any) -> Optional["PatternAnalysis"]:
+        """
+        LLM이 돌려준 JSON에서 패턴을 만듭니다. 요약이나 유효한 유형이 없으면 None.
+        """
+        if not isinstance(data, dict):
+            return None
+        category = str(data.get("category", "")).strip().lower()
+        summary = str(data.get("summary") or data.get("user_pattern_summary") or "").strip()
+        if category not in OBSESSION_TYPES or not summary:
+            return None
+        return cls(
+            trigger=str(data.get("trigger", "")).strip(),
+            behaviour=str(data.get("behaviour", "")).strip(),
+            category=category,
+            summary=summary,
+        )
+
+    def to_prompt(self, new_messages: Optional[List[str]] = None) -> str:
+        """
+        이후 단계 프롬프트에 원본 대화 대신 넣을 구조화된 입력입니다.
+        패턴을 파악한 뒤에 새로 들어온 사용자 메시지만 원문으로 덧붙입니다.
+        """
+        lines = [
+            "사용자 패턴 분석:",
+            f"- 계기: {self.trigger or '알 수 없음'}",
+            f"- 행동: {self.behaviour or '알 수 없음'}",
+            f"- 유형: {self.category}",
+            f"- 요약: {self.summary}",
+        ]
+        if new_messages:
+            lines.append(f"이후 사용자 메시지: {' '.join(new_messages)}")
+        return "\n".join(lines)
+
+
+def context_hash(user_turns: List[Any]) -> str:
+    payload = json.dumps(user_turns, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _Entry:
+    analysis: PatternAnalysis
+    #패턴을 파악할 때 히스토리에 있던 사용자 메시지 수와 그중 마지막 window개의 해시
+    user_turns: int
+    window_hash: str
+
+
+class PatternAnalysisStore:
+    """
+    세션별 패턴 분석 결과를 보관합니다.
+
+    패턴은 최근 window개의 사용자 메시지로 파악하므로, 그 메시지들의 해시를 함께 저장합니다.
+    이후 요청의 히스토리가 같은 메시지로 이어지는 대화이고 새 메시지가 window개 미만이면
+    저장된 패턴과 새 메시지만으로 프롬프트를 만들 수 있습니다. 그 외에는 다시 분석합니다.
+    """
+
+    def __init__(self, window: int = 5, max_sessions: int = 10000):
+        self.window = window
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def get(self, session_id: Optional[str], user_turns: List[Any]) -> Optional[Tuple[PatternAnalysis, List[Any]]]:
+        """
+        재사용할 수 있는 패턴과 그 뒤에 새로 들어온 사용자 메시지 원본(content) 목록을 반환합니다.
+        """
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+        if entry is None or not entry.user_turns <= len(user_turns) < entry.user_turns + self.window:
+            metrics.inc("pattern_analysis_lookups_total", outcome="miss")
+            return None
+        window = user_turns[max(0, entry.user_turns - self.window):entry.user_turns]
+        if context_hash(window) != entry.window_hash:
+            #같은 session_id로 다른 대화가 시작된 경우
+            metrics.inc("pattern_analysis_lookups_total", outcome="stale")
+            return None
+        metrics.inc("pattern_analysis_lookups_total", outcome="hit")
+        return entry.analysis, user_turns[entry.user_turns:]
+
+    def put(self, session_id: Optional[str], user_turns: List[Any], analysis: PatternAnalysis) -> None:
+        if not session_id:
+            return
+        entry = _Entry(analysis, len(user_turns), context_hash(user_turns[-self.window:]))
+        with self._lock:
+            self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        metrics.inc("pattern_analysis_stored_total")
@@ -0,0 +1,98 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+#LLM 호출 우선순위 클래스
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+#작업 중단 사유
+REASON_DEADLINE = "deadline_exceeded"
+REASON_DISCONNECTED = "client_disconnected"
+
+
+class DeadlineExceeded(Exception):
+    """
+    요청 마감 시간이 지났거나 클라이언트가 연결을 끊어 LLM 호출을 포기할 때 발생합니다.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class RequestContext:
+    """
+    ChatbotService 메서드 호출 하나에 딸린 요청 정보입니다.
+    메서드 시그니처를 바꾸지 않고 LLM 호출 경로(_invoke)까지 전달하기 위해 ContextVar로 보관합니다.
+    """
+    session_id: Optional[str] = None
+    priority: str = PRIORITY_INTERACTIVE
+    #time.monotonic() 기준 마감 시각 (None이면 제한 없음)
+    deadline: Optional[float] = None
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    cancel_reason: Optional[str] = None
+    #요청에 지정된 타임아웃 원본 값 (캡처/리플레이용)
+    timeout_ms: Optional[float] = None
+    #요청이 도착한 시각 time.time() (캡처/리플레이용)
+    arrived_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def with_timeout(cls, session_id: Optional[str], priority: str, timeout_ms: Optional[float]) -> "RequestContext":
+        if not timeout_ms or timeout_ms <= 0:
+            return cls(session_id=session_id, priority=priority)
+        return cls(session_id=session_id, priority=priority,
+                   deadline=time.monotonic() + timeout_ms / 1000, timeout_ms=timeout_ms)
+
+    def remaining(self) -> Optional[float]:
+        """
+        마감까지 남은 시간(초). 마감이 없으면 None.
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def cancel(self, reason: str) -> None:
+        if not self.cancelled.is_set():
+            self.cancel_reason = reason
+            self.cancelled.set()
+
+    def abandon_reason(self) -> Optional[str]:
+        """
+        더 이상 작업할 필요가 없으면 그 사유를, 아니면 None을 반환합니다.
+        """
+        if self.cancelled.is_set():
+            return self.cancel_reason
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            return REASON_DEADLINE
+        return None
+
+
+_current: ContextVar[RequestContext] = ContextVar("request_context", default=RequestContext())
+
+
+def current_context() -> RequestContext:
+    return _current.get()
+
+
+@contextmanager
+def request_scope(context: RequestContext) -> Iterator[RequestContext]:
+    """
+    with 블록 안에서 호출되는 ChatbotService 메서드에 요청 정보를 적용합니다.
+    예: 오프라인 재분석 작업
+        with request_scope(RequestContext(session_id=sid, priority=PRIORITY_BACKGROUND)):
+            chatbot_service.generate_obsession_analysis3_response(history)
+    """
+    if context.priority not in PRIORITIES:
+        context.priority = PRIORITY_INTERACTIVE
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
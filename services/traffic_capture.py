@@ -0,0 +1,210 @@
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from core.logging import get_logger
+from core.metrics import metrics
+
+logger = get_logger(__name__)
+
+#캡처 파일에 민감 정보가 남지 않도록 마스킹할 패턴
+_EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_PATTERN = re.compile(r"(?<!\d)01[016789][-\s]?\d{3,4}[-\s]?\d{4}(?!\d)")
+_RRN_PATTERN = re.compile(r"(?<!\d)\d{6}[-\s]?[1-4]\d{6}(?!\d)")
+
+#세션 ID는 원문 대신 해시로 기록 (리플레이 시에도 동일 세션끼리 묶이도록 결정적 해시 사용)
+_SESSION_ID_PREFIX = "s_"
+
+_STOP = object()
+
+
+def sanitize_text(text: str) -> str:
+    """
+    이메일, 전화번호, 주민등록번호를 마스킹합니다.
+    이미 마스킹된 문자열에 다시 적용해도 결과가 같습니다.
+    """
+    text = _EMAIL_PATTERN.sub("[EMAIL]", text)
+    text = _RRN_PATTERN.sub("[RRN]", text)
+    text = _PHONE_PATTERN.sub("[PHONE]", text)
+    return text
+
+
+def sanitize_session_id(session_id: Optional[str]) -> Optional[str]:
+    if not session_id or session_id.startswith(_SESSION_ID_PREFIX):
+        return session_id
+    digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:16]
+    return f"{_SESSION_ID_PREFIX}{digest}"
+
+
+def sanitize_payload(value: Any) -> Any:
+    """
+    요청/응답 페이로드를 재귀적으로 순회하며 session_id는 해시로, 문자열은 마스킹합니다.
+    """
+    if isinstance(value, dict):
+        sanitized = {}
+        for key, item in value.items():
+            if key == "session_id" and (item is None or isinstance(item, str)):
+                sanitized[key] = sanitize_session_id(item)
+            else:
+                sanitized[key] = sanitize_payload(item)
+        return sanitized
+    if isinstance(value, list):
+        return [sanitize_payload(item) for item in value]
+    if isinstance(value, str):
+        return sanitize_text(value)
+    return value
+
+
+def prompt_key(task: str, messages: List[Any]) -> str:
+    """
+    LLM 호출을 식별하는 결정적 키를 만듭니다.
+    마스킹된 프롬프트 기준으로 계산하므로 캡처 시점과 리플레이 시점의 키가 일치합니다.
+    """
+    parts = [task]
+    for message in messages:
+        parts.append(getattr(message, "type", ""))
+        parts.append(sanitize_text(str(message.content)))
+    raw = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TrafficCapture:
+    """
+    요청 페이로드와 LLM 응답을 JSONL 파일에 비동기로 기록합니다.
+    요청 경로에서는 큐에 넣기만 하고, 마스킹과 파일 쓰기는 백그라운드 스레드가 담당합니다.
+    """
+
+    def __init__(self, path: str, enabled: bool = False, queue_size: int = 10000):
+        self.path = path
+        self.enabled = enabled
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def record_request(self, endpoint: str, payload: Dict[str, Any], response: Optional[Dict[str, Any]],
+                       status: int, latency_ms: float, headers: Optional[Dict[str, str]] = None,
+                       arrived_at: Optional[float] = None) -> None:
+        """
+        arrived_at은 요청이 도착한 시각(time.time())입니다. 리플레이는 이 값으로 요청 간격을 재현합니다.
+        """
+        if not self.enabled:
+            return
+        self._enqueue({
+            "type": "request",
+            "ts": arrived_at if arrived_at is not None else time.time(),
+            "endpoint": endpoint,
+            "headers": headers or {},
+            "payload": payload,
+            "response": response,
+            "status": status,
+            "latency_ms": round(latency_ms, 3),
+        })
+
+    def record_completion(self, task: str, key: str, completion: str) -> None:
+        if not self.enabled:
+            return
+        self._enqueue({
+            "type": "llm",
+            "ts": time.time(),
+            "task": task,
+            "key": key,
+            "completion": completion,
+        })
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        큐에 남은 레코드를 모두 기록한 뒤 쓰기 스레드를 종료합니다.
+        """
+        with self._lock:
+            writer = self._writer
+            self._writer = None
+        if writer is None or not writer.is_alive():
+            return
+        try:
+            #큐가 가득 차 있으면 쓰기 스레드가 자리를 비울 때까지만 기다림
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error(f"트래픽 캡처 스레드가 {timeout}초 안에 끝나지 않았습니다")
+            return
+        writer.join(timeout)
+
+    def _enqueue(self, record: Dict[str, Any]) -> None:
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            #요청 지연을 만들지 않도록 큐가 가득 차면 버림
+            self.dropped += 1
+            logger.warning(f"트래픽 캡처 큐가 가득 차 레코드를 버립니다 (누적 {self.dropped}건)")
+
+    def _ensure_writer(self) -> None:
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            if self._writer is not None:
+                #파일 열기 실패 등으로 쓰기 스레드가 죽었으면 새로 시작 (큐에 남은 레코드는 새 스레드가 기록)
+                metrics.inc("traffic_capture_writer_restarts_total")
+                logger.error("트래픽 캡처 스레드가 종료되어 다시 시작합니다")
+            self._writer = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        try:
+            f = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            logger.error(f"트래픽 캡처 파일을 열 수 없습니다: {e}")
+            return
+        try:
+            while True:
+                record = self._queue.get()
+                if record is _STOP:
+                    break
+                f.write(json.dumps(self._sanitize(record), ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    f.flush()
+        except Exception as e:
+            logger.error(f"트래픽 캡처 스레드 오류: {e}")
+        finally:
+            f.close()
+
+    @staticmethod
+    def _sanitize(record: Dict[str, Any]) -> Dict[str, Any]:
+        #긴 히스토리는 마스킹 비용이 크므로 요청 경로가 아닌 쓰기 스레드에서 처리
+        if record["type"] == "request":
+            record["payload"] = sanitize_payload(record["payload"])
+            record["response"] = sanitize_payload(record["response"])
+        elif record["type"] == "llm":
+            record["completion"] = sanitize_text(record["completion"])
+        return record
+
+
+class ReplayCompletions:
+    """
+    캡처 파일에서 LLM 응답을 읽어 프롬프트 키로 조회할 수 있게 합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._completions: Dict[str, str] = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get("type") == "llm":
+                    self._completions[record["key"]] = record["completion"]
+        logger.info(f"리플레이 응답 {len(self._completions)}건 로드: {path}")
+
+    def get(self, key: str) -> Optional[str]:
+        return self._completions.get(key)
+
+    def __len__(self) -> int:
+        return len(self._completions)
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+#ChatOpenAI 생성에 API 키가 필요하지만 테스트는 실제 OpenAI를 호출하지 않음
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+#요약 갱신(백그라운드 LLM 호출)과 분석 결과 저장은 필요한 테스트에서만 켬
+os.environ.setdefault("CONVERSATION_SUMMARY_ENABLED", "false")
+os.environ.setdefault("ANALYTICS_SINK_ENABLED", "false")
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """
+    OpenAI chat completions 형식으로 고정 응답을 돌려주는 로컬 HTTP 서버입니다.
+    서버 쪽에서 받은 커넥션 수와 요청 수를 셉니다.
+    """
+    daemon_threads = True
+
+    def __init__(self, completion: str = "ok"):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.completion = completion
+        #지정하면 chat completions 요청에 이 상태 코드로 응답
+        self.fail_status = None
+        #받은 chat completions 요청 본문
+        self.payloads = []
+        #chat completions 응답 전 지연(초)
+        self.latency = 0.0
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def _send(self, status: int, body: bytes = b"") -> None:
+        with self.server._lock:
+            self.server.requests += 1
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        #워밍업 요청들이 서로 겹치도록 실제 왕복 시간처럼 잠깐 기다림
+        time.sleep(0.05)
+        self._send(200)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        self.server.payloads.append(request)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.fail_status is not None:
+            self._send(self.server.fail_status, b'{"error": {"message": "stub failure"}}')
+            return
+        body = {
+            "id": "stub", "object": "chat.completion", "created": 0, "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.server.completion},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+        self._send(200, json.dumps(body).encode("utf-8"))
+
+
+@pytest.fixture
+def stub_llm_server():
+    server = StubLLMServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
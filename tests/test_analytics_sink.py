@@ -0,0 +1,135 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app import obsession_router
+from models.request import ObsessionAnalysisRequest, ObsessionAnalysisResponse
+from services.analytics_sink import POLICY_BLOCK, POLICY_DROP, AnalyticsSink
+from services.input_triage import DECISION_FULL, TriageDecision
+from services.request_context import RequestContext
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT endpoint, session_id, obsession_type, result FROM analysis_results").fetchall()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "analytics.db")
+
+
+def test_close_writes_queued_results(db_path):
+    sink = AnalyticsSink(db_path, batch_size=1000, flush_interval=60)
+    for i in range(5):
+        assert sink.record("/obsession/analyze4", "session-1", {"obsession_type": "checking", "i": i},
+                           obsession_type="checking")
+    sink.close(timeout=5)
+
+    rows = _rows(db_path)
+    assert len(rows) == 5
+    endpoint, session_id, obsession_type, _ = rows[0]
+    assert endpoint == "/obsession/analyze4"
+    assert obsession_type == "checking"
+    #session_id는 해시로 저장
+    assert session_id != "session-1"
+
+
+def test_disabled_sink_records_nothing(db_path):
+    sink = AnalyticsSink(db_path, enabled=False)
+    assert not sink.record("/obsession/analyze", "s", {})
+    sink.close()
+    assert sink._writer is None
+
+
+def test_full_queue_drops_results(db_path, monkeypatch):
+    sink = AnalyticsSink(db_path, queue_size=2, batch_size=1, policy=POLICY_DROP)
+    release = threading.Event()
+    flush = sink._flush
+    monkeypatch.setattr(sink, "_flush", lambda conn, batch: (release.wait(5), flush(conn, batch)))
+
+    results = [sink.record("/obsession/analyze", "s", {"i": i}) for i in range(10)]
+    release.set()
+    sink.close(timeout=5)
+
+    assert results.count(False) == sink.dropped > 0
+    assert len(_rows(db_path)) == results.count(True)
+
+
+def test_dead_writer_is_restarted(db_path, monkeypatch):
+    sink = AnalyticsSink(db_path, flush_interval=0.01)
+    next_batch = sink._next_batch
+    calls = []
+
+    def crash_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("writer crashed")
+        return next_batch()
+
+    monkeypatch.setattr(sink, "_next_batch", crash_once)
+    sink.record("/obsession/analyze", "s", {"i": 0})
+    sink._writer.join(5)
+    assert not sink._writer.is_alive()
+
+    sink.record("/obsession/analyze", "s", {"i": 1})
+    assert sink._writer.is_alive()
+    sink.close(timeout=5)
+
+    assert len(_rows(db_path)) == 2
+
+
+def test_close_does_not_hang_when_writer_died_with_a_full_queue(db_path, monkeypatch):
+    sink = AnalyticsSink(db_path, queue_size=2)
+    monkeypatch.setattr(sink, "_next_batch", lambda: (_ for _ in ()).throw(RuntimeError("writer crashed")))
+    sink.record("/obsession/analyze", "s", {})
+    sink._writer.join(5)
+    while not sink._queue.full():
+        sink._queue.put_nowait({})
+
+    started = time.monotonic()
+    sink.close(timeout=1)
+
+    assert time.monotonic() - started < 1
+    assert sink._queue.empty()
+
+
+def test_try_record_does_not_wait_or_drop_when_full(db_path, monkeypatch):
+    sink = AnalyticsSink(db_path, queue_size=1, policy=POLICY_BLOCK, block_timeout=5)
+    #쓰기 스레드 없이 큐만 채움
+    monkeypatch.setattr(sink, "_ensure_writer", lambda: None)
+
+    assert sink.try_record("/obsession/analyze", "s", {"i": 0})
+    started = time.monotonic()
+    assert not sink.try_record("/obsession/analyze", "s", {"i": 1})
+
+    assert time.monotonic() - started < 0.5
+    assert sink.dropped == 0
+
+
+def test_store_result_uses_the_threadpool_only_when_the_queue_is_full(db_path, monkeypatch):
+    sink = AnalyticsSink(db_path, queue_size=1, policy=POLICY_BLOCK)
+    monkeypatch.setattr(sink, "_ensure_writer", lambda: None)
+    monkeypatch.setattr(obsession_router, "analytics_sink", sink)
+    offloaded = []
+
+    async def fake_run_in_threadpool(func, *args):
+        offloaded.append(args[0])
+        return False
+
+    monkeypatch.setattr(obsession_router, "run_in_threadpool", fake_run_in_threadpool)
+    request = ObsessionAnalysisRequest(user_text="문을 계속 확인해요", session_id="s")
+    response = ObsessionAnalysisResponse(question="q", choices=["a", "b", "c"], session_id="s")
+
+    async def store_twice():
+        for _ in range(2):
+            await obsession_router._store_result("/analyze", request, response, time.perf_counter(),
+                                                 RequestContext("s"), TriageDecision(DECISION_FULL, "ok"))
+
+    asyncio.run(store_twice())
+
+    assert sink._queue.qsize() == 1
+    assert offloaded == [f"{obsession_router.router.prefix}/analyze"]
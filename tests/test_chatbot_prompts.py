@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from core.config import settings
+from services.chatbot_service import ChatbotService
+from services.conversation_summary import ConversationSummaryStore
+from services.http_pool import LLMHttpPool
+from services.pattern_analysis import PatternAnalysis, PatternAnalysisStore
+from services.request_context import RequestContext, request_scope
+
+
+@pytest.fixture
+def service():
+    service = ChatbotService()
+    yield service
+    service.http_pool.close()
+
+
+def _history(user_turns):
+    history = []
+    for i in range(user_turns):
+        history.append({"role": "user", "content": f"turn-{i}"})
+        history.append({"role": "assistant", "content": "..."})
+    return history
+
+
+def test_summary_covers_only_turns_outside_the_raw_window(service):
+    summarized = []
+
+    def summarize(session_id, previous, new_messages):
+        summarized.extend(new_messages)
+        return "요약"
+
+    service.conversation_summaries = ConversationSummaryStore(
+        summarize=summarize, stringify=service._stringify_message_content,
+        window=service.recent_window, run_inline=True
+    )
+    service.pattern_analyses = None
+    history = _history(8)
+
+    user_turns = service.user_turns(history)
+    with request_scope(RequestContext("s1")):
+        service._analysis_prompt("대화 히스토리", user_turns, None)
+        prompt = service._analysis_prompt("대화 히스토리", user_turns, None)
+
+    raw = service.recent_user_messages(history, service.recent_window)
+    assert prompt.startswith("이전 대화 요약: 요약\n")
+    assert summarized == [f"turn-{i}" for i in range(8 - service.recent_window)]
+    assert not set(summarized) & set(raw)
+    assert all(turn in prompt for turn in raw)
+
+
+@pytest.fixture
+def stub_service(stub_llm_server):
+    service = ChatbotService(http_pool=LLMHttpPool(stub_llm_server.base_url, http2=False))
+    service.pattern_analyses = PatternAnalysisStore(window=service.recent_window)
+    yield service
+    service.close()
+
+
+def test_analysis4_reuses_the_pattern_from_analysis3(stub_service, stub_llm_server):
+    stub_llm_server.completion = json.dumps({
+        "trigger": "외출할 때", "behaviour": "문 잠금 반복 확인", "category": "checking",
+        "user_pattern_summary": "당신은 문을 반복해서 확인하는 경향이 있는 것 같아요.",
+        "thought_examples": ["a", "b", "c"],
+    }, ensure_ascii=False)
+    history = _history(3)
+
+    with request_scope(RequestContext("s1")):
+        stub_service.generate_obsession_analysis3_response(history)
+        stub_llm_server.completion = "확인하고 싶은 마음이 드는 건 자연스러워요."
+        result = stub_service.generate_obsession_analysis4_response(history)
+
+    assert result["obsession_type"] == "checking"
+    #analysis3, analysis4 두 번만 호출하고 유형 분류 호출은 건너뜀
+    assert len(stub_llm_server.payloads) == 2
+    assert "사용자 패턴 분석:" in stub_llm_server.payloads[1]["messages"][-1]["content"]
+
+
+def test_analysis4_without_a_pattern_uses_the_fast_classifier(stub_service, stub_llm_server):
+    stub_llm_server.completion = "checking"
+
+    with request_scope(RequestContext("s1")):
+        stub_service.generate_obsession_analysis4_response(_history(3))
+
+    categorize = stub_llm_server.payloads[0]
+    assert categorize["model"] == settings.OPENAI_FAST_MODEL
+    assert categorize["max_tokens"] == 5
+
+
+def test_analysis4_reclassifies_an_unknown_cached_category(stub_service, stub_llm_server):
+    history = _history(3)
+    stub_service.pattern_analyses.put(
+        "s1", stub_service.user_turns(history),
+        PatternAnalysis(trigger="", behaviour="", category="hoarding", summary="당신은 물건을 모으는 경향이 있어요.")
+    )
+    stub_llm_server.completion = "other"
+
+    with request_scope(RequestContext("s1")):
+        result = stub_service.generate_obsession_analysis4_response(history)
+
+    assert result["obsession_type"] == "other"
+    assert stub_llm_server.payloads[0]["model"] == settings.OPENAI_FAST_MODEL
+
+
+def test_analysis3_uses_a_low_temperature(stub_service, stub_llm_server):
+    with request_scope(RequestContext("s1")):
+        stub_service.generate_obsession_analysis3_response(_history(3))
+
+    #analysis3의 유형을 analysis4가 재사용하므로 분류가 요청마다 흔들리지 않아야 함
+    assert stub_llm_server.payloads[0]["temperature"] <= 0.2
+
+
+@pytest.mark.parametrize("user_turns", [6, 7, 8])
+@pytest.mark.parametrize("call", [
+    lambda service, history: service.generate_obsession_analysis2_response(history),
+    lambda service, history: service.generate_obsession_analysis3_response(history),
+    lambda service, history: service.generate_obsession_analysis4_response(history),
+    lambda service, history: service.generate_obsession_analysis5_response(history),
+    lambda service, history: service.generate_obsession_analysis6_response(history),
+    lambda service, history: service.generate_chat_response("새 메시지", history),
+], ids=["analysis2", "analysis3", "analysis4", "analysis5", "analysis6", "chat"])
+def test_every_user_turn_is_sent_raw_or_summarized(stub_service, stub_llm_server, call, user_turns):
+    summarized = []
+
+    def summarize(session_id, previous, new_messages):
+        summarized.extend(new_messages)
+        return "요약"
+
+    stub_service.conversation_summaries = ConversationSummaryStore(
+        summarize=summarize, stringify=stub_service._stringify_message_content,
+        window=stub_service.recent_window, run_inline=True
+    )
+    history = _history(user_turns)
+
+    with request_scope(RequestContext("s1")):
+        call(stub_service, history)
+
+    prompts = " ".join(message["content"] for payload in stub_llm_server.payloads for message in payload["messages"])
+    for i in range(user_turns):
+        assert f"turn-{i}" in summarized or f"turn-{i}" in prompts, f"turn-{i}"
+
+
+def test_generate_methods_use_the_user_turns_passed_in(stub_service, stub_llm_server, monkeypatch):
+    history = _history(3)
+    user_turns = stub_service.user_turns(history)
+    monkeypatch.setattr(stub_service, "user_turns", lambda conversation_history: pytest.fail("history rescanned"))
+
+    with request_scope(RequestContext("s1")):
+        stub_service.generate_obsession_analysis4_response(history, user_turns)
+        stub_service.generate_obsession_analysis5_response(history, user_turns)
+
+    assert "turn-2" in stub_llm_server.payloads[-1]["messages"][-1]["content"]
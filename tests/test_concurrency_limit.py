@@ -0,0 +1,70 @@
+import pytest
+
+from services.concurrency_limit import AIMDLimit, FixedLimit, GradientLimit, limit_from_settings
+from services.llm_scheduler import LLMScheduler
+from services.request_context import PRIORITY_INTERACTIVE
+
+
+def test_fixed_limit_ignores_feedback():
+    limit = FixedLimit(8)
+    limit.update(100.0, 8, ok=False)
+    assert limit.current == 8
+
+
+def test_aimd_grows_while_saturated_and_backs_off_on_errors():
+    limit = AIMDLimit(4, min_limit=2, max_limit=10, latency_threshold=1.0, backoff=0.5)
+
+    for _ in range(20):
+        limit.update(0.1, in_flight=limit.current, ok=True)
+    grown = limit.current
+    assert grown > 4
+
+    limit.update(0.1, in_flight=grown, ok=False)
+    assert limit.current == int(grown * 0.5)
+    limit.update(5.0, in_flight=1, ok=True)
+    limit.update(5.0, in_flight=1, ok=True)
+    assert limit.current == 2
+
+
+def test_aimd_does_not_grow_when_idle():
+    limit = AIMDLimit(8, min_limit=2, max_limit=64)
+    for _ in range(50):
+        limit.update(0.1, in_flight=1, ok=True)
+    assert limit.current == 8
+
+
+def test_gradient_grows_at_baseline_latency_and_shrinks_when_latency_rises():
+    limit = GradientLimit(8, min_limit=2, max_limit=64)
+
+    for _ in range(50):
+        limit.update(0.1, in_flight=limit.current, ok=True)
+    grown = limit.current
+    assert grown > 8
+
+    for _ in range(50):
+        limit.update(0.5, in_flight=limit.current, ok=True)
+    assert limit.current < grown
+
+
+def test_gradient_keeps_a_baseline_per_task():
+    limit = GradientLimit(16, min_limit=2, max_limit=64)
+    for _ in range(30):
+        #짧은 분류 호출과 긴 생성 호출이 섞여도 각자의 기준과 비교하므로 한도가 줄지 않음
+        limit.update(0.05, in_flight=limit.current, ok=True, key="categorize")
+        limit.update(2.0, in_flight=limit.current, ok=True, key="analysis3")
+    assert limit.current >= 16
+
+
+@pytest.mark.parametrize("algorithm, expected", [("gradient", GradientLimit), ("aimd", AIMDLimit),
+                                                 ("fixed", FixedLimit), ("unknown", FixedLimit)])
+def test_limit_from_settings(algorithm, expected):
+    assert type(limit_from_settings(algorithm)) is expected
+
+
+def test_scheduler_follows_the_limit():
+    scheduler = LLMScheduler(64, limit=AIMDLimit(4, min_limit=2, max_limit=64, backoff=0.5))
+    assert scheduler.stats()[PRIORITY_INTERACTIVE]["limit"] == 4
+
+    scheduler.record_call(1.0, ok=False)
+    assert scheduler.max_concurrency == 2
+    assert scheduler.stats()[PRIORITY_INTERACTIVE]["limit"] == 2
@@ -0,0 +1,79 @@
+import pytest
+from langchain.schema import HumanMessage
+
+from services.chatbot_service import ChatbotService
+from services.degradation import LatencyEstimator
+from services.http_pool import LLMHttpPool
+from services.request_context import PRIORITY_INTERACTIVE, RequestContext, request_scope
+
+MESSAGES = [HumanMessage(content="문을 잠갔는지 계속 확인해요")]
+
+
+@pytest.fixture
+def service(stub_llm_server):
+    service = ChatbotService(http_pool=LLMHttpPool(stub_llm_server.base_url, http2=False))
+    yield service
+    service.close()
+
+
+def _invoke_with_budget(service, timeout_ms):
+    with request_scope(RequestContext.with_timeout("s1", PRIORITY_INTERACTIVE, timeout_ms)):
+        try:
+            return service._invoke("analysis2", MESSAGES, local=lambda: "local")
+        except Exception as e:
+            return type(e).__name__
+
+
+def test_failures_never_lower_the_estimate():
+    estimator = LatencyEstimator(initial=2.0)
+
+    estimator.observe_failure("analysis2", 0.3)
+    assert estimator.estimate("analysis2") == pytest.approx(2.0)
+    estimator.observe_failure("analysis2", 5.0)
+    assert estimator.estimate("analysis2") == pytest.approx(5.0)
+
+    estimator.observe("analysis2", 1.0)
+    assert estimator.estimate("analysis2") == pytest.approx(5.0 + 0.2 * (1.0 - 5.0))
+
+
+def test_probes_are_rate_limited_per_task():
+    estimator = LatencyEstimator(probe_interval=60)
+
+    assert estimator.try_probe("analysis2")
+    assert not estimator.try_probe("analysis2")
+    assert estimator.try_probe("analysis3")
+    estimator.observe("analysis3", 0.1)
+    assert not estimator.try_probe("analysis3")
+
+
+def test_short_budget_probes_the_llm_and_learns_it_is_fast(service, stub_llm_server):
+    service.latency_estimator = LatencyEstimator(initial=2.0, probe_interval=60)
+
+    paths = [_invoke_with_budget(service, 500) for _ in range(3)]
+
+    #첫 요청이 추정치(2초)보다 짧은 마감으로 한 번 호출해 보고, 빠르다는 것을 알게 된 뒤에는 계속 호출
+    assert paths == ["ok", "ok", "ok"]
+    assert service.latency_estimator.estimate("analysis2") < 0.5
+
+
+def test_slow_upstream_keeps_short_budget_requests_degraded(service, stub_llm_server):
+    #추정치가 실제(0.6초)보다 낮게 남아 있는 상태에서 300ms 마감 요청이 이어지는 경우
+    stub_llm_server.latency = 0.6
+    service.latency_estimator = LatencyEstimator(initial=0.1, probe_interval=60)
+
+    paths = [_invoke_with_budget(service, 300) for _ in range(20)]
+
+    assert paths[0] == "APITimeoutError"
+    assert paths[1:] == ["local"] * 19
+    assert len(stub_llm_server.payloads) == 1
+    assert service.latency_estimator.estimate("analysis2") >= 0.3
+
+
+def test_failed_llm_call_is_not_retried(service, stub_llm_server):
+    stub_llm_server.fail_status = 500
+
+    with request_scope(RequestContext("s1")):
+        with pytest.raises(Exception):
+            service._invoke("analysis2", MESSAGES)
+
+    assert len(stub_llm_server.payloads) == 1
@@ -0,0 +1,47 @@
+import pytest
+
+from core.metrics import metrics
+from services.http_pool import LLMHttpPool
+
+
+def _gauge(name):
+    series = metrics.snapshot()["gauges"].get(name, [])
+    return series[0]["value"] if series else None
+
+
+@pytest.fixture
+def pool(stub_llm_server):
+    pool = LLMHttpPool(stub_llm_server.base_url, max_keepalive_connections=4, http2=False)
+    yield pool
+    pool.close()
+
+
+def test_warm_up_opens_connections(pool, stub_llm_server):
+    assert pool.warm_up(2) == 2
+    assert stub_llm_server.connections == 2
+    assert pool.stats()["connections_opened"] == 2
+
+
+def test_requests_after_warm_up_reuse_connections(pool, stub_llm_server):
+    pool.warm_up(2)
+    for _ in range(10):
+        response = pool.client.post(f"{stub_llm_server.base_url}/chat/completions",
+                                    json={"model": "stub", "messages": []})
+        assert response.status_code == 200
+
+    stats = pool.stats()
+    assert stub_llm_server.connections == 2
+    assert stats["requests"] == 12
+    assert stats["connections_opened"] == 2
+    assert stats["reused_requests"] == 10
+    assert _gauge("llm_http_connection_reuse_ratio") == pytest.approx(1 - 2 / 12, abs=1e-4)
+
+
+def test_close_closes_pool(pool, stub_llm_server):
+    pool.warm_up(2)
+    pool.close()
+
+    assert pool.client.is_closed
+    assert pool.client._transport._pool.connections == []
+    with pytest.raises(RuntimeError):
+        pool.client.head(stub_llm_server.base_url)
@@ -0,0 +1,37 @@
+import pytest
+
+from services.input_triage import DECISION_FALLBACK, DECISION_FULL, InputTriage
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("", "empty"),
+    ("   ", "whitespace"),
+    ("😭😭 !!", "no_text"),
+    ("ㅠ", "single_char"),
+])
+def test_degenerate_input_gets_fallback(text, reason):
+    decision = InputTriage().triage_text("/analyze", text)
+    assert decision.decision == DECISION_FALLBACK
+    assert decision.reason == reason
+
+
+def test_resent_request_is_not_a_duplicate():
+    #클라이언트 재시도는 같은 요청을 그대로 다시 보냄
+    triage = InputTriage()
+    messages = ["손을 자꾸 씻게 돼요", "문을 잠갔는지 계속 확인해요"]
+
+    assert triage.triage_messages("/analyze3", messages).needs_llm
+    assert triage.triage_messages("/analyze3", messages).needs_llm
+
+
+def test_repeated_user_turn_in_history_is_a_duplicate():
+    decision = InputTriage().triage_messages("/analyze3", ["손을 자꾸 씻게 돼요", "손을 자꾸 씻게 돼요 "])
+
+    assert decision.decision == DECISION_FALLBACK
+    assert decision.reason == "duplicate"
+
+
+def test_duplicate_detection_can_be_disabled():
+    decision = InputTriage().triage_messages("/analyze4", ["손을 자꾸 씻게 돼요"] * 2, detect_duplicates=False)
+
+    assert decision.decision == DECISION_FULL
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import obsession_router
+from services.llm_scheduler import LLMScheduler
+from services.request_context import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, REASON_DEADLINE,
+                                      DeadlineExceeded, RequestContext)
+
+
+class _ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def _hold_slot(scheduler, priority, session_id, seconds):
+    with scheduler.slot(priority, session_id):
+        time.sleep(seconds)
+
+
+@pytest.fixture
+def worker_limiters():
+    #스레드 한도는 이벤트 루프마다 새로 만들어야 함
+    obsession_router._worker_limiters.clear()
+    yield
+    obsession_router._worker_limiters.clear()
+
+
+def test_background_flood_does_not_starve_interactive_requests(worker_limiters):
+    #background 클래스는 한 번에 하나만 실행되므로 나머지는 스케줄러에서 스레드를 잡은 채 대기
+    scheduler = LLMScheduler(4, shares={PRIORITY_INTERACTIVE: 1.0, PRIORITY_BACKGROUND: 0.25})
+    request = _ConnectedRequest()
+
+    async def scenario():
+        background = [
+            asyncio.ensure_future(obsession_router._call_service(
+                request, RequestContext(f"batch-{i}", PRIORITY_BACKGROUND),
+                _hold_slot, scheduler, PRIORITY_BACKGROUND, f"batch-{i}", 0.05
+            ))
+            for i in range(100)
+        ]
+        await asyncio.sleep(0.2)
+        submitted = time.perf_counter()
+        started = await obsession_router._call_service(
+            request, RequestContext("user", PRIORITY_INTERACTIVE), time.perf_counter
+        )
+        wait = started - submitted
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        return wait
+
+    assert asyncio.run(scenario()) < 0.5
+
+
+def test_interactive_is_granted_before_background():
+    scheduler = LLMScheduler(1, shares={PRIORITY_INTERACTIVE: 1.0, PRIORITY_BACKGROUND: 1.0})
+    order = []
+
+    def call(priority, session_id):
+        with scheduler.slot(priority, session_id):
+            order.append(priority)
+
+    with scheduler.slot(PRIORITY_INTERACTIVE, "holder"):
+        threads = [threading.Thread(target=call, args=(PRIORITY_BACKGROUND, "batch"))]
+        threads[0].start()
+        while scheduler.stats()[PRIORITY_BACKGROUND]["queued"] < 1:
+            time.sleep(0.001)
+        threads.append(threading.Thread(target=call, args=(PRIORITY_INTERACTIVE, "user")))
+        threads[1].start()
+        while scheduler.stats()[PRIORITY_INTERACTIVE]["queued"] < 1:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(1)
+
+    assert order == [PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND]
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = LLMScheduler(1)
+    order = []
+
+    def call(session_id):
+        with scheduler.slot(PRIORITY_INTERACTIVE, session_id):
+            order.append(session_id)
+
+    threads = []
+    with scheduler.slot(PRIORITY_INTERACTIVE, "holder"):
+        for session_id in ("a", "a", "a", "b"):
+            thread = threading.Thread(target=call, args=(session_id,))
+            thread.start()
+            threads.append(thread)
+            while scheduler.stats()[PRIORITY_INTERACTIVE]["queued"] < len(threads):
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join(1)
+
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_waiter_leaves_queue_when_deadline_passes():
+    scheduler = LLMScheduler(1)
+    context = RequestContext.with_timeout("late", PRIORITY_INTERACTIVE, 50)
+
+    with scheduler.slot(PRIORITY_INTERACTIVE, "holder"):
+        with pytest.raises(DeadlineExceeded) as excinfo:
+            with scheduler.slot(PRIORITY_INTERACTIVE, "late", context):
+                pass
+
+    assert excinfo.value.reason == REASON_DEADLINE
+    assert scheduler.stats()[PRIORITY_INTERACTIVE]["queued"] == 0
@@ -0,0 +1,44 @@
+from services.pattern_analysis import PatternAnalysis, PatternAnalysisStore
+
+ANALYSIS = PatternAnalysis(trigger="외출할 때", behaviour="문 잠금 확인", category="checking",
+                           summary="당신은 문을 반복해서 확인하는 경향이 있는 것 같아요.")
+
+
+def test_from_dict_requires_a_summary_and_a_known_category():
+    assert PatternAnalysis.from_dict({"category": "checking", "user_pattern_summary": "요약"}).summary == "요약"
+    assert PatternAnalysis.from_dict({"category": "hoarding", "summary": "요약"}) is None
+    assert PatternAnalysis.from_dict({"category": "checking"}) is None
+    assert PatternAnalysis.from_dict("checking") is None
+
+
+def test_get_returns_the_pattern_and_new_turns():
+    store = PatternAnalysisStore(window=3)
+    store.put("s1", ["a", "b", "c"], ANALYSIS)
+
+    assert store.get("s1", ["a", "b", "c"]) == (ANALYSIS, [])
+    assert store.get("s1", ["a", "b", "c", "d", "e"]) == (ANALYSIS, ["d", "e"])
+
+
+def test_pattern_expires_after_a_full_window_of_new_turns():
+    store = PatternAnalysisStore(window=3)
+    store.put("s1", ["a", "b", "c"], ANALYSIS)
+
+    assert store.get("s1", ["a", "b", "c", "d", "e", "f"]) is None
+    assert store.get("s1", ["a", "b"]) is None
+
+
+def test_a_different_conversation_under_the_same_session_is_stale():
+    store = PatternAnalysisStore(window=3)
+    store.put("s1", ["a", "b", "c"], ANALYSIS)
+
+    assert store.get("s1", ["x", "y", "z", "d"]) is None
+    assert store.get(None, ["a", "b", "c"]) is None
+
+
+def test_oldest_sessions_are_evicted():
+    store = PatternAnalysisStore(window=3, max_sessions=2)
+    for session_id in ("s1", "s2", "s3"):
+        store.put(session_id, ["a"], ANALYSIS)
+
+    assert store.get("s1", ["a"]) is None
+    assert store.get("s3", ["a"]) == (ANALYSIS, [])
@@ -0,0 +1,221 @@
+import json
+
+import httpx
+import pytest
+from langchain.schema import HumanMessage, SystemMessage
+
+from core.config import settings
+from scripts import replay_traffic
+from services.chatbot_service import ChatbotService
+from services.http_pool import LLMHttpPool
+from services.request_context import PRIORITY_INTERACTIVE, RequestContext, request_scope
+from services.traffic_capture import (
+    ReplayCompletions, TrafficCapture, prompt_key, sanitize_payload, sanitize_session_id, sanitize_text
+)
+
+MESSAGES = [SystemMessage(content="강박 유형을 분석하세요"), HumanMessage(content="문을 잠갔는지 계속 확인해요")]
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_sanitize_text_masks_pii_and_is_idempotent():
+    text = "메일 hong.gildong+test@example.co.kr 전화 010-1234-5678 주민번호 900101-1234567"
+
+    masked = sanitize_text(text)
+
+    assert masked == "메일 [EMAIL] 전화 [PHONE] 주민번호 [RRN]"
+    assert sanitize_text(masked) == masked
+    #숫자가 이어진 긴 문자열 일부를 전화번호로 오인하지 않음
+    assert sanitize_text("주문번호 01012345678901") == "주문번호 01012345678901"
+
+
+def test_sanitize_session_id_is_a_stable_hash():
+    hashed = sanitize_session_id("session-1")
+
+    assert hashed.startswith("s_") and "session-1" not in hashed
+    assert sanitize_session_id("session-1") == hashed
+    assert sanitize_session_id("session-2") != hashed
+    #이미 해시된 값과 빈 값은 그대로
+    assert sanitize_session_id(hashed) == hashed
+    assert sanitize_session_id(None) is None
+
+
+def test_sanitize_payload_walks_nested_values():
+    payload = {
+        "session_id": "session-1",
+        "conversation_history": [{"role": "user", "content": "연락처는 010 1234 5678 이에요", "turn": 3}],
+        "score": 0.5,
+    }
+
+    sanitized = sanitize_payload(payload)
+
+    assert sanitized == {
+        "session_id": sanitize_session_id("session-1"),
+        "conversation_history": [{"role": "user", "content": "연락처는 [PHONE] 이에요", "turn": 3}],
+        "score": 0.5,
+    }
+    #원본은 바꾸지 않음
+    assert payload["session_id"] == "session-1"
+
+
+def test_prompt_key_is_stable_and_matches_the_masked_prompt():
+    key = prompt_key("analysis2", MESSAGES)
+
+    assert prompt_key("analysis2", list(MESSAGES)) == key
+    assert prompt_key("analysis3", MESSAGES) != key
+    assert prompt_key("analysis2", [HumanMessage(content="문을 잠갔는지 계속 확인해요")]) != key
+    #캡처 파일에는 마스킹된 프롬프트만 남으므로 리플레이 시에도 같은 키가 나와야 함
+    raw = [HumanMessage(content="제 메일은 a@b.com 이에요")]
+    masked = [HumanMessage(content=sanitize_text(raw[0].content))]
+    assert prompt_key("analysis2", raw) == prompt_key("analysis2", masked)
+
+
+def test_capture_writes_sanitized_records(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(path, enabled=True)
+
+    capture.record_request("/obsession/analyze2", {"session_id": "session-1", "message": "a@b.com"},
+                           {"response": "010-1234-5678"}, 200, 12.3456, arrived_at=100.0)
+    capture.record_completion("analysis2", "k1", "답장은 a@b.com 으로")
+    capture.close()
+
+    request, completion = _records(path)
+    assert request["ts"] == 100.0
+    assert request["payload"] == {"session_id": sanitize_session_id("session-1"), "message": "[EMAIL]"}
+    assert request["response"] == {"response": "[PHONE]"}
+    assert request["latency_ms"] == 12.346
+    assert completion == {"type": "llm", "ts": completion["ts"], "task": "analysis2", "key": "k1",
+                          "completion": "답장은 [EMAIL] 으로"}
+
+
+def test_disabled_capture_starts_no_writer(tmp_path):
+    capture = TrafficCapture(str(tmp_path / "capture.jsonl"))
+
+    capture.record_completion("analysis2", "k1", "ok")
+    capture.close()
+
+    assert capture._writer is None
+    assert not (tmp_path / "capture.jsonl").exists()
+
+
+def test_dead_writer_is_restarted(tmp_path):
+    #처음에는 디렉터리가 없어 파일을 열 수 없음
+    path = tmp_path / "missing" / "capture.jsonl"
+    capture = TrafficCapture(str(path), enabled=True)
+
+    capture.record_completion("analysis2", "k1", "first")
+    capture._writer.join(5)
+    assert not capture._writer.is_alive()
+
+    path.parent.mkdir()
+    capture.record_completion("analysis2", "k2", "second")
+    assert capture._writer.is_alive()
+    capture.close()
+
+    #죽은 스레드가 큐에 남긴 레코드도 새 스레드가 기록
+    assert [r["key"] for r in _records(path)] == ["k1", "k2"]
+
+
+def test_close_does_not_hang_when_writer_died_with_a_full_queue(tmp_path):
+    capture = TrafficCapture(str(tmp_path / "missing" / "capture.jsonl"), enabled=True, queue_size=2)
+    capture.record_completion("analysis2", "k1", "ok")
+    capture._writer.join(5)
+    capture.record_completion("analysis2", "k2", "ok")
+    capture._writer.join(5)
+
+    capture.close(timeout=1)
+
+    assert capture._writer is None
+
+
+def test_replay_completions_reads_only_llm_records(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    path.write_text(
+        json.dumps({"type": "request", "ts": 1.0, "endpoint": "/obsession/analyze", "payload": {}}) + "\n"
+        + "\n"
+        + json.dumps({"type": "llm", "ts": 2.0, "task": "analysis2", "key": "k1", "completion": "답"}) + "\n",
+        encoding="utf-8"
+    )
+
+    replay = ReplayCompletions(str(path))
+
+    assert len(replay) == 1
+    assert replay.get("k1") == "답"
+    assert replay.get("k2") is None
+
+
+def _invoke(service, messages):
+    with request_scope(RequestContext.with_timeout("s1", PRIORITY_INTERACTIVE, 10000)):
+        return service._invoke("analysis2", messages)
+
+
+def test_captured_completions_are_replayed_without_the_llm(tmp_path, stub_llm_server, monkeypatch):
+    path = str(tmp_path / "capture.jsonl")
+    capture = TrafficCapture(path, enabled=True)
+    stub_llm_server.completion = "캡처된 응답"
+    service = ChatbotService(traffic_capture=capture,
+                             http_pool=LLMHttpPool(stub_llm_server.base_url, http2=False))
+    try:
+        assert _invoke(service, MESSAGES) == "캡처된 응답"
+    finally:
+        service.close()
+        capture.close()
+    assert len(stub_llm_server.payloads) == 1
+
+    monkeypatch.setattr(settings, "TRAFFIC_REPLAY_PATH", path)
+    replaying = ChatbotService(http_pool=LLMHttpPool(stub_llm_server.base_url, http2=False))
+    try:
+        assert _invoke(replaying, MESSAGES) == "캡처된 응답"
+        #캡처에 없는 프롬프트는 LLM을 부르지 않고 실패
+        with pytest.raises(LookupError):
+            _invoke(replaying, [HumanMessage(content="다른 질문")])
+    finally:
+        replaying.close()
+    assert len(stub_llm_server.payloads) == 1
+
+
+def test_load_requests_sorts_requests_by_arrival(tmp_path):
+    path = tmp_path / "capture.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in [
+        {"type": "request", "ts": 2.0, "endpoint": "/b"},
+        {"type": "llm", "ts": 1.5, "key": "k", "completion": "c"},
+        {"type": "request", "ts": 1.0, "endpoint": "/a"},
+    ]), encoding="utf-8")
+
+    assert [r["endpoint"] for r in replay_traffic.load_requests(str(path))] == ["/a", "/b"]
+
+
+def test_replay_reports_matches_and_mismatches(monkeypatch):
+    def handler(request):
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"echo": body["message"]})
+
+    client = httpx.AsyncClient
+    monkeypatch.setattr(replay_traffic.httpx, "AsyncClient",
+                        lambda **kwargs: client(transport=httpx.MockTransport(handler), **kwargs))
+    records = [
+        {"ts": 10.0, "endpoint": "/obsession/analyze", "payload": {"message": "a"},
+         "response": {"echo": "a"}, "status": 200, "latency_ms": 5.0},
+        {"ts": 10.01, "endpoint": "/obsession/analyze2", "payload": {"message": "b"},
+         "response": {"echo": "changed"}, "status": 200, "latency_ms": 7.0},
+    ]
+
+    results = replay_traffic.asyncio.run(
+        replay_traffic.replay(records, "http://app", "/api/v1", rate=1.0, timeout=5.0)
+    )
+    summary = replay_traffic.summarize(results, elapsed=1.0)
+
+    assert [r["match"] for r in results] == [True, False]
+    assert summary["sent"] == 2
+    assert summary["errors"] == 0
+    assert summary["mismatches"] == 1
+    assert summary["captured_latency_ms"]["p99"] == 7.0
+
+
+def test_percentile():
+    assert replay_traffic.percentile([], 50) == 0.0
+    assert replay_traffic.percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert replay_traffic.percentile([3.0, 1.0, 2.0], 99) == 3.0